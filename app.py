@@ -6,8 +6,15 @@ import os
 import sys
 from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / "src"))
+# Let the CUDA caching allocator grow segments in place rather than fragment
+# across clips; must be set before torch is imported. An explicit setting in
+# the environment wins
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
+# Add src to path (once)
+src_path = str(Path(__file__).parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
 
 from src.__version__ import __version__
 from src.ui.gradio_interface import create_interface
@@ -1,12 +1,19 @@
 """
 Main entry point for LEMM - Let Everyone Make Music
 """
+import os
 import sys
 from pathlib import Path
 
+# Let the CUDA caching allocator grow segments in place rather than fragment
+# across clips; must be set before torch is imported. An explicit setting in
+# the environment wins
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
 # Add src to path
-src_path = Path(__file__).parent / "src"
-sys.path.insert(0, str(src_path))
+src_path = str(Path(__file__).parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
 
 from src.__version__ import __version__
 from src.ui.gradio_interface import create_interface
@@ -0,0 +1,87 @@
+"""
+RBJ biquad coefficients for the enhancement EQs
+
+Shared by the SciPy (CPU) and torch (GPU) filter paths. The formulas match
+the JUCE filters behind Pedalboard's shelf and peak plugins.
+"""
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+
+def _omega(sample_rate: int, cutoff_hz: float) -> float:
+    """Normalised angular frequency, kept below Nyquist so the filter stays stable"""
+    return 2.0 * math.pi * min(cutoff_hz, 0.49 * sample_rate) / sample_rate
+
+
+def shelf(sample_rate: int, cutoff_hz: float, gain_db: float, q: float = 0.707,
+          high: bool = False) -> Tuple[List[float], List[float]]:
+    """
+    Shelving filter coefficients
+
+    Args:
+        sample_rate: Sample rate
+        cutoff_hz: Shelf frequency
+        gain_db: Shelf gain in dB
+        q: Shelf slope (Q)
+        high: High shelf if True, otherwise low shelf
+
+    Returns:
+        Tuple of (b, a) coefficients (not normalised)
+    """
+    sign = -1 if high else 1
+    amp = 10.0 ** (gain_db / 40.0)
+    w0 = _omega(sample_rate, cutoff_hz)
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2.0 * q)
+    sqrt_amp = 2.0 * math.sqrt(amp) * alpha
+    b = [
+        amp * ((amp + 1) - sign * (amp - 1) * cos_w0 + sqrt_amp),
+        sign * 2 * amp * ((amp - 1) - sign * (amp + 1) * cos_w0),
+        amp * ((amp + 1) - sign * (amp - 1) * cos_w0 - sqrt_amp),
+    ]
+    a = [
+        (amp + 1) + sign * (amp - 1) * cos_w0 + sqrt_amp,
+        -sign * 2 * ((amp - 1) + sign * (amp + 1) * cos_w0),
+        (amp + 1) + sign * (amp - 1) * cos_w0 - sqrt_amp,
+    ]
+    return b, a
+
+
+def peak(sample_rate: int, cutoff_hz: float, gain_db: float,
+         q: float = 0.707) -> Tuple[List[float], List[float]]:
+    """
+    Peaking EQ coefficients
+
+    Args:
+        sample_rate: Sample rate
+        cutoff_hz: Centre frequency
+        gain_db: Gain at the centre frequency in dB
+        q: Bandwidth (Q)
+
+    Returns:
+        Tuple of (b, a) coefficients (not normalised)
+    """
+    amp = 10.0 ** (gain_db / 40.0)
+    w0 = _omega(sample_rate, cutoff_hz)
+    alpha = math.sin(w0) / (2.0 * q)
+    cos_w0 = math.cos(w0)
+    b = [1 + alpha * amp, -2 * cos_w0, 1 - alpha * amp]
+    a = [1 + alpha / amp, -2 * cos_w0, 1 - alpha / amp]
+    return b, a
+
+
+def to_sos(*sections: Tuple[List[float], List[float]]) -> np.ndarray:
+    """
+    Stack biquads into a normalised second-order-sections array
+
+    Args:
+        sections: (b, a) coefficient pairs, applied in order
+
+    Returns:
+        Array of shape (n_sections, 6) for scipy.signal.sosfilt
+    """
+    return np.array([[*b, *a] for b, a in sections], dtype=np.float64) / np.array(
+        [[a[0]] * 6 for _, a in sections]
+    )
@@ -2,9 +2,60 @@
 Audio Mixer for chaining clips and final mixing
 """
 from typing import Dict, Any, List, Tuple
+import math
 import numpy as np
 from loguru import logger
 
+from src.audio.stems import Stems
+from src.utils.device import get_device
+from src.utils.optional_numba import NUMBA_AVAILABLE, maybe_njit, prange
+
+
+# Per-stem mix levels (stems not listed use DEFAULT_STEM_VOLUME)
+STEM_VOLUMES = {
+    'vocals': 0.9,
+    'drums': 0.8,
+    'bass': 0.7,
+}
+DEFAULT_STEM_VOLUME = 0.6
+
+# Below this many stem samples (S * N), mix with a plain JIT loop instead of
+# BLAS to avoid its thread-pool start-up cost on short clips
+SMALL_MIX_SIZE = 1 << 18
+
+
+def _peak(x: np.ndarray) -> float:
+    """Absolute peak of a signal without allocating an abs() temporary"""
+    return max(float(x.max()), -float(x.min()))
+
+
+# Per-sample mastering kernels are JIT-compiled when Numba is installed;
+# otherwise the limiter falls back to NumPy ufuncs
+if NUMBA_AVAILABLE:
+    @maybe_njit(parallel=True)
+    def _soft_limit(x, drive=0.95, ceiling=0.99):
+        """Soft-limit audio in place with a scaled tanh (single pass)"""
+        for i in prange(x.shape[0]):
+            x[i] = math.tanh(x[i] * drive) * ceiling
+        return x
+    
+    @maybe_njit
+    def _mix_small(stems, weights, out):
+        """Weighted sum of (S, N) stems into out[N] (serial, no thread pool)"""
+        for j in range(stems.shape[1]):
+            acc = 0.0
+            for i in range(stems.shape[0]):
+                acc += weights[i] * stems[i, j]
+            out[j] = acc
+        return out
+else:
+    def _soft_limit(x, drive=0.95, ceiling=0.99):
+        """Soft-limit audio in place with a scaled tanh"""
+        np.multiply(x, drive, out=x)
+        np.tanh(x, out=x)
+        np.multiply(x, ceiling, out=x)
+        return x
+
 
 class AudioMixer:
     """Mixes and chains audio clips"""
@@ -19,15 +70,29 @@ class AudioMixer:
         self.config = config
         self.sample_rate = config.get("audio", {}).get("sample_rate", 44100)
         self.crossfade_duration = config.get("audio", {}).get("crossfade_duration", 2)
+        self.backend = config.get("audio", {}).get("mixer_backend", "numpy")
+        self.mixer_device = config.get("audio", {}).get("mixer_device", "cuda")
+        self.mixer_cuda_graphs = config.get("audio", {}).get("mixer_cuda_graphs", True)
+        self._torch_fades = None
+        self._last_master_len = None
+        self._master_graph = None
         
-        logger.info("Audio Mixer initialized")
+        # Precompute crossfade curves once (reused for every clip transition)
+        self._cf_samples = int(self.crossfade_duration * self.sample_rate)
+        # (arange * step stays in float32 end to end, unlike linspace)
+        fade_step = np.float32(1.0 / (self._cf_samples - 1)) if self._cf_samples > 1 else np.float32(0)
+        self._fade_in = np.arange(self._cf_samples, dtype=np.float32) * fade_step
+        self._fade_out = 1.0 - self._fade_in
+        
+        logger.info(f"Audio Mixer initialized - backend: {self.backend}")
     
-    def chain_clips(self, clips: List[Dict[str, np.ndarray]]) -> np.ndarray:
+    def chain_clips(self, clips: List[Dict[str, Any]]) -> np.ndarray:
         """
         Chain multiple clips with crossfading
         
         Args:
-            clips: List of clip dictionaries (each containing stems)
+            clips: List of clip dictionaries (each containing stems as NumPy
+                arrays, or torch tensors with the torch backend)
             
         Returns:
             Final mixed audio
@@ -35,17 +100,21 @@ class AudioMixer:
         try:
             logger.info(f"Chaining {len(clips)} clips")
             
-            # Mix stems within each clip first
+            if self.backend == "torch":
+                return self._chain_clips_torch(clips)
+            
+            # Mix stems within each clip first (fix dtype/layout once at ingest
+            # so the crossfade writes below never need implicit conversions)
             mixed_clips = []
             for i, clip_stems in enumerate(clips):
                 mixed = self.mix_stems(clip_stems)
-                mixed_clips.append(mixed)
+                mixed_clips.append(np.ascontiguousarray(mixed, dtype=np.float32))
             
             # Chain clips with crossfading
             chained = self._chain_with_crossfade(mixed_clips)
             
-            # Apply final mastering
-            final = self.master(chained)
+            # Apply final mastering (chained is freshly allocated, so master in place)
+            final = self.master(chained, inplace=True)
             
             return final
             
@@ -71,26 +140,27 @@ class AudioMixer:
             # - Panning
             # - Effects
             
-            # Placeholder: simple addition
-            mixed = np.zeros_like(list(stems.values())[0])
-            
-            for stem_name, stem_audio in stems.items():
-                # Apply stem-specific volume levels
-                if stem_name == 'vocals':
-                    stem_audio = stem_audio * 0.9
-                elif stem_name == 'drums':
-                    stem_audio = stem_audio * 0.8
-                elif stem_name == 'bass':
-                    stem_audio = stem_audio * 0.7
-                else:
-                    stem_audio = stem_audio * 0.6
-                
-                mixed += stem_audio
+            # Placeholder: weighted sum with stem-specific volume levels,
+            # computed as a single matrix-vector product over the stacked stems
+            weights = np.array(
+                [STEM_VOLUMES.get(name, DEFAULT_STEM_VOLUME) for name in stems],
+                dtype=np.float32
+            )
+            if isinstance(stems, Stems):
+                # Already one (stems, samples) array; no need to stack
+                stacked = stems.data.astype(np.float32, copy=False)
+            else:
+                stacked = np.stack(list(stems.values())).astype(np.float32, copy=False)
+            if NUMBA_AVAILABLE and stacked.ndim == 2 and stacked.size < SMALL_MIX_SIZE:
+                mixed = _mix_small(stacked, weights, np.empty(stacked.shape[1], dtype=np.float32))
+            else:
+                mixed = np.tensordot(weights, stacked, axes=1)
             
-            # Normalize to prevent clipping
-            max_val = np.abs(mixed).max()
+            # Normalize to prevent clipping (mixed is freshly allocated, so in
+            # place with the gain folded into one scalar)
+            max_val = _peak(mixed)
             if max_val > 0:
-                mixed = mixed / max_val * 0.95
+                mixed *= 0.95 / max_val
             
             return mixed
             
@@ -114,11 +184,17 @@ class AudioMixer:
         try:
             logger.info("Chaining clips with crossfade")
             
-            crossfade_samples = int(self.crossfade_duration * self.sample_rate)
+            if len(clips) == 2:
+                return self._crossfade_two(clips[0], clips[1])
+            
+            crossfade_samples = self._cf_samples
+            fade_in = self._fade_in
+            fade_out = self._fade_out
             
             # Calculate total length
             total_samples = sum(len(clip) for clip in clips) - (len(clips) - 1) * crossfade_samples
             result = np.zeros(total_samples, dtype=np.float32)
+            scratch = np.empty(crossfade_samples, dtype=np.float32)
             
             current_pos = 0
             
@@ -129,16 +205,12 @@ class AudioMixer:
                     current_pos += len(clip) - crossfade_samples
                 else:
                     # Subsequent clips: crossfade with previous
-                    fade_in = np.linspace(0, 1, crossfade_samples)
-                    fade_out = np.linspace(1, 0, crossfade_samples)
-                    
-                    # Crossfade region
-                    overlap_start = current_pos
-                    overlap_end = current_pos + crossfade_samples
+                    overlap = result[current_pos:current_pos + crossfade_samples]
                     
-                    # Apply crossfade
-                    result[overlap_start:overlap_end] *= fade_out
-                    result[overlap_start:overlap_end] += clip[:crossfade_samples] * fade_in
+                    # Apply crossfade in place (no per-clip temporaries)
+                    np.multiply(overlap, fade_out, out=overlap)
+                    np.multiply(clip[:crossfade_samples], fade_in, out=scratch)
+                    np.add(overlap, scratch, out=overlap)
                     
                     # Add rest of clip
                     remaining_start = current_pos + crossfade_samples
@@ -157,12 +229,40 @@ class AudioMixer:
             logger.error(f"Error in crossfade: {e}")
             raise
     
-    def master(self, audio: np.ndarray) -> np.ndarray:
+    def _crossfade_two(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """
+        Crossfade exactly two clips (straight-line fast path)
+        
+        Args:
+            first: Leading clip
+            second: Trailing clip
+            
+        Returns:
+            Chained audio
+        """
+        cf = self._cf_samples
+        head = len(first) - cf
+        
+        result = np.empty(len(first) + len(second) - cf, dtype=np.float32)
+        result[:head] = first[:head]
+        
+        overlap = result[head:head + cf]
+        np.multiply(first[head:], self._fade_out, out=overlap)
+        overlap += np.multiply(second[:cf], self._fade_in, dtype=np.float32)
+        
+        result[head + cf:] = second[cf:]
+        
+        logger.info("Crossfade complete")
+        return result
+    
+    def master(self, audio: np.ndarray, inplace: bool = False) -> np.ndarray:
         """
         Apply final mastering to audio
         
         Args:
             audio: Input audio
+            inplace: Process ``audio`` directly instead of a copy (the caller
+                must own the buffer; non-contiguous input is still copied)
             
         Returns:
             Mastered audio
@@ -177,15 +277,16 @@ class AudioMixer:
             # - Stereo enhancement
             
             # Placeholder: normalize and apply soft limiter
-            mastered = audio.copy()
+            if inplace and audio.flags.c_contiguous:
+                mastered = audio
+            else:
+                mastered = audio.copy()
             
-            # Normalize
-            max_val = np.abs(mastered).max()
-            if max_val > 0:
-                mastered = mastered / max_val
-            
-            # Soft limiting (simple tanh)
-            mastered = np.tanh(mastered * 0.95) * 0.99
+            # Normalize and soft-limit (simple tanh) in a single in-place pass:
+            # the 1/peak normalization gain is folded into the limiter drive
+            max_val = _peak(mastered)
+            drive = 0.95 / max_val if max_val > 0 else 0.95
+            _soft_limit(mastered.reshape(-1), drive)
             
             logger.info("Mastering complete")
             return mastered
@@ -194,6 +295,178 @@ class AudioMixer:
             logger.error(f"Error in mastering: {e}")
             raise
     
+    def _chain_clips_torch(self, clips: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Mix, chain and master clips with torch ops on the mixer device
+        
+        Stems stay on the device for the whole mix; the result is copied to
+        the host once at the end.
+        
+        Args:
+            clips: List of clip dictionaries (stems as arrays or tensors)
+            
+        Returns:
+            Final mixed audio
+        """
+        import torch
+        
+        device = get_device(self.mixer_device)
+        
+        with torch.inference_mode():
+            mixed_clips = [self._mix_stems_torch(stems, device) for stems in clips]
+            chained = self._chain_with_crossfade_torch(mixed_clips, device)
+            final = self._master_torch(chained)
+            
+            return final.cpu().numpy()
+    
+    def _mix_stems_torch(self, stems: Dict[str, Any], device: str):
+        """
+        Torch version of mix_stems (weighted sum + peak normalization)
+        
+        Args:
+            stems: Dictionary of audio stems (arrays or tensors)
+            device: Device to mix on
+            
+        Returns:
+            Mixed audio tensor
+        """
+        import torch
+        
+        weights = torch.tensor(
+            [STEM_VOLUMES.get(name, DEFAULT_STEM_VOLUME) for name in stems],
+            dtype=torch.float32, device=device
+        )
+        if isinstance(stems, Stems):
+            stacked = torch.as_tensor(stems.data, dtype=torch.float32, device=device)
+        else:
+            stacked = torch.stack([
+                torch.as_tensor(stem, dtype=torch.float32, device=device)
+                for stem in stems.values()
+            ])
+        mixed = torch.tensordot(weights, stacked, dims=1)
+        
+        # Normalize to prevent clipping (clamp avoids a host sync on the peak)
+        peak = mixed.abs().amax()
+        return mixed.mul_(0.95 / peak.clamp_min(1e-12))
+    
+    def _get_torch_fades(self, device: str):
+        """Crossfade curves as tensors on ``device`` (built once per device)"""
+        import torch
+        
+        if self._torch_fades is None or self._torch_fades[0] != device:
+            fade_in = torch.from_numpy(self._fade_in).to(device)
+            fade_out = torch.from_numpy(self._fade_out).to(device)
+            self._torch_fades = (device, fade_in, fade_out)
+        return self._torch_fades[1], self._torch_fades[2]
+    
+    def _chain_with_crossfade_torch(self, clips: List[Any], device: str):
+        """
+        Torch version of _chain_with_crossfade
+        
+        Args:
+            clips: List of mixed audio tensors
+            device: Device the clips live on
+            
+        Returns:
+            Chained audio tensor
+        """
+        import torch
+        
+        if len(clips) == 1:
+            return clips[0]
+        
+        cf = self._cf_samples
+        fade_in, fade_out = self._get_torch_fades(device)
+        
+        total_samples = sum(clip.shape[0] for clip in clips) - (len(clips) - 1) * cf
+        result = torch.empty(total_samples, dtype=torch.float32, device=device)
+        
+        # First clip is copied as-is; each following clip overlaps the tail
+        result[:clips[0].shape[0]] = clips[0]
+        current_pos = clips[0].shape[0] - cf
+        for clip in clips[1:]:
+            overlap = result[current_pos:current_pos + cf]
+            overlap.mul_(fade_out).addcmul_(clip[:cf], fade_in)
+            result[current_pos + cf:current_pos + clip.shape[0]] = clip[cf:]
+            current_pos += clip.shape[0] - cf
+        
+        return result
+    
+    @staticmethod
+    def _master_torch_inplace(audio):
+        """Normalize and soft-limit a tensor in place (torch version of master)"""
+        peak = audio.abs().amax()
+        drive = 0.95 / peak.clamp_min(1e-12)
+        return audio.mul_(drive).tanh_().mul_(0.99)
+    
+    def _master_torch(self, audio):
+        """
+        Torch version of master (normalization folded into the limiter)
+        
+        On CUDA, once the same output length is mastered twice in a row the
+        op sequence is captured into a CUDA graph and replayed afterwards.
+        
+        Args:
+            audio: Input audio tensor (modified in place)
+            
+        Returns:
+            Mastered audio tensor (may be a static graph buffer that is
+            overwritten by the next call - copy it before reuse)
+        """
+        length = audio.shape[0]
+        if not (audio.is_cuda and self.mixer_cuda_graphs):
+            return self._master_torch_inplace(audio)
+        
+        if self._master_graph is not None and self._master_graph[0] == length:
+            _, graph, static = self._master_graph
+            static.copy_(audio)
+            graph.replay()
+            return static
+        
+        if self._last_master_len != length:
+            self._last_master_len = length
+            return self._master_torch_inplace(audio)
+        
+        try:
+            self._master_graph = (length,) + self._capture_master_graph(audio)
+        except Exception as e:
+            logger.warning(f"CUDA graph capture for mastering failed, staying eager: {e}")
+            self.mixer_cuda_graphs = False
+            return self._master_torch_inplace(audio)
+        
+        _, graph, static = self._master_graph
+        static.copy_(audio)
+        graph.replay()
+        return static
+    
+    def _capture_master_graph(self, audio):
+        """
+        Capture the mastering ops for ``audio``'s shape into a CUDA graph
+        
+        Args:
+            audio: Example input tensor (not modified)
+            
+        Returns:
+            Tuple of (graph, static input/output buffer)
+        """
+        import torch
+        
+        static = audio.clone()
+        
+        # Warm up on a side stream before capture, as CUDA graphs require
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            self._master_torch_inplace(audio.clone())
+        torch.cuda.current_stream().wait_stream(stream)
+        
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            self._master_torch_inplace(static)
+        
+        logger.info(f"Captured mastering CUDA graph for {audio.shape[0]} samples")
+        return graph, static
+    
     def align_beats(self, clip1: np.ndarray, clip2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         Align beats between two clips using Librosa
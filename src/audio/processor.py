@@ -1,13 +1,20 @@
 """
 Audio Processor for stem separation and enhancement
 """
-from typing import Dict, Any, List, Tuple, TYPE_CHECKING
+import inspect
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 import numpy as np
 import torch
 from pathlib import Path
-from demucs.pretrained import get_model
-from demucs.apply import apply_model
 from loguru import logger
+from scipy.signal import sosfilt
+
+from src.audio import biquad
+from src.audio.stems import Stems
+from src.utils.device import cuda_available, get_device
 
 # Import pedalboard with proper type checking
 try:
@@ -21,6 +28,145 @@ except ImportError:
     Pedalboard = None  # type: ignore
     logger.warning("Pedalboard not available - install with: pip install pedalboard")
 
+# Optional ONNX Runtime backend for CPU-only Demucs inference
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    ort = None  # type: ignore
+
+# Block size Pedalboard streams audio through its plugins with
+PEDALBOARD_BUFFER_SIZE = 8192
+
+
+def _apply_vectorized(model, mix: torch.Tensor, shifts: int = 1, overlap: float = 0.25,
+                      segment_batch: int = 4) -> torch.Tensor:
+    """
+    Batched equivalent of ``demucs.apply.apply_model(..., split=True)``
+    
+    apply_model runs one forward pass per overlapping segment. Here all
+    segments are cut up front and pushed through the model in sub-batches of
+    ``segment_batch`` (times the mix batch size), then overlap-added with the
+    same triangular window, random shifts and bag-of-models weighting.
+    
+    Args:
+        model: Demucs model or BagOfModels
+        mix: Mixture tensor (batch, channels, samples)
+        shifts: Number of random time shifts to average over
+        overlap: Overlap between segments (fraction)
+        segment_batch: Segments per forward pass (caps VRAM)
+        
+    Returns:
+        Separated sources (batch, stems, channels, samples)
+    """
+    import random
+    from demucs.apply import BagOfModels, TensorChunk
+    from demucs.utils import center_trim
+    
+    if isinstance(model, BagOfModels):
+        estimates = 0.
+        totals = [0.] * len(model.sources)
+        for sub_model, model_weights in zip(model.models, model.weights):
+            out = _apply_vectorized(sub_model, mix, shifts, overlap, segment_batch)
+            for k, inst_weight in enumerate(model_weights):
+                out[:, k] *= inst_weight
+                totals[k] += inst_weight
+            estimates = estimates + out
+        for k in range(estimates.shape[1]):
+            estimates[:, k] /= totals[k]
+        return estimates
+    
+    batch, channels, length = mix.shape
+    
+    if shifts:
+        max_shift = int(0.5 * model.samplerate)
+        padded_mix = TensorChunk(mix).padded(length + 2 * max_shift)
+        out = 0.
+        for _ in range(shifts):
+            offset = random.randint(0, max_shift)
+            shifted = TensorChunk(padded_mix, offset, length + max_shift - offset)
+            out = out + _apply_vectorized(model, shifted, 0, overlap, segment_batch)[..., max_shift - offset:]
+        return out / shifts
+    
+    segment_length = int(model.samplerate * model.segment)
+    stride = int((1 - overlap) * segment_length)
+    weight = torch.cat([
+        torch.arange(1, segment_length // 2 + 1, device=mix.device),
+        torch.arange(segment_length - segment_length // 2, 0, -1, device=mix.device)
+    ]).float()
+    weight = weight / weight.max()
+    
+    # Cut every segment up front, padded to the length the model expects
+    chunks = []
+    for offset in range(0, length, stride):
+        chunk = TensorChunk(mix, offset, segment_length)
+        valid_length = model.valid_length(chunk.length) if hasattr(model, 'valid_length') else chunk.length
+        chunks.append((offset, chunk.length, chunk.padded(valid_length)))
+    
+    out = torch.zeros(batch, len(model.sources), channels, length, device=mix.device)
+    sum_weight = torch.zeros(length, device=mix.device)
+    
+    # Segments of equal padded length are run together in sub-batches
+    step = max(1, segment_batch)
+    groups: Dict[int, List[Tuple[int, int, torch.Tensor]]] = {}
+    for item in chunks:
+        groups.setdefault(item[2].shape[-1], []).append(item)
+    for group in groups.values():
+        for start in range(0, len(group), step):
+            part = group[start:start + step]
+            stacked = torch.cat([padded for _, _, padded in part])  # (n * batch, C, L)
+            with torch.no_grad():
+                result = model(stacked)
+            result = result.view(len(part), batch, *result.shape[1:])
+            for (offset, chunk_length, _), chunk_out in zip(part, result):
+                chunk_out = center_trim(chunk_out, chunk_length)
+                out[..., offset:offset + chunk_length] += weight[:chunk_length] * chunk_out
+                sum_weight[offset:offset + chunk_length] += weight[:chunk_length]
+    
+    return out / sum_weight
+
+
+class _OnnxDemucs(torch.nn.Module):
+    """
+    Demucs network served by an ONNX Runtime session
+    
+    Stands in for one (sub-)model inside the Demucs bag: exposes the
+    attributes the segmenting code reads and runs forward passes through
+    the session. Only those attributes are copied from the torch model, so
+    its weights are released once it is swapped out.
+    """
+    
+    def __init__(self, model: torch.nn.Module, onnx_path: str):
+        super().__init__()
+        options = ort.SessionOptions()  # type: ignore
+        options.intra_op_num_threads = 0
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL  # type: ignore
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL  # type: ignore
+        self.session = ort.InferenceSession(  # type: ignore
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Exported with a fixed segment length; shorter chunks are padded to it
+        self.input_length = model_input.shape[-1]
+        if not isinstance(self.input_length, int):
+            raise ValueError(
+                f"{onnx_path} has a dynamic segment length; re-export it with export_onnx"
+            )
+        self.samplerate = model.samplerate
+        self.segment = model.segment
+        self.sources = model.sources
+        self.audio_channels = model.audio_channels
+    
+    def valid_length(self, length: int) -> int:
+        return self.input_length
+    
+    def forward(self, mix: torch.Tensor) -> torch.Tensor:
+        outputs = self.session.run(None, {self.input_name: mix.float().numpy()})
+        return torch.from_numpy(outputs[0])
+
 
 class AudioProcessor:
     """Processes audio clips with stem separation and enhancement"""
@@ -36,64 +182,425 @@ class AudioProcessor:
         self.sample_rate = config.get("audio", {}).get("sample_rate", 44100)
         self.demucs_model = None
         self.sovits_model = None
+        self._stem_names: Tuple[str, ...] = ()
+        self.skip_separation_when_no_vocals = config.get("audio", {}).get(
+            "skip_separation_when_no_vocals", True
+        )
         self.device = config.get("models", {}).get("demucs", {}).get("device", "cuda")
         self.demucs_name = config.get("models", {}).get("demucs", {}).get("model", "htdemucs")
         self.demucs_shifts = config.get("models", {}).get("demucs", {}).get("shifts", 1)
         self.demucs_split = config.get("models", {}).get("demucs", {}).get("split", True)
+        self.demucs_overlap = config.get("models", {}).get("demucs", {}).get("overlap", 0.25)
+        self.demucs_segment_batch = config.get("models", {}).get("demucs", {}).get("segment_batch", 4)
+        self.demucs_compile = config.get("models", {}).get("demucs", {}).get("compile", False)
+        # Opt-in: half precision changes separation output numerically
+        self.demucs_autocast = config.get("models", {}).get("demucs", {}).get("autocast_dtype", "off")
+        self.demucs_onnx_path = config.get("models", {}).get("demucs", {}).get("onnx_path")
+        self.demucs_int8 = config.get("models", {}).get("demucs", {}).get("int8", False)
+        self.pipeline_clips = config.get("models", {}).get("demucs", {}).get("pipeline_clips", 2)
+        self.enhance_workers = config.get("audio", {}).get("enhance_workers") or max(
+            1, (os.cpu_count() or 2) // 2
+        )
+        # The torch chains only approximate Pedalboard (louder output), so opt-in
+        self.gpu_enhancement = config.get("audio", {}).get("gpu_enhancement", False)
+        self._device_chains = None
+        self._pinned_in = None
+        
+        # Effect chains are stateful, so every enhancement thread gets its own;
+        # the pool is kept across calls so those boards are built only once
+        self._thread_boards = threading.local()
+        self._enhance_executor: Optional[ThreadPoolExecutor] = None
+        
+        # The EQ stages of the chains run as SciPy biquad cascades; the
+        # boards only hold the nonlinear effects
+        self._vocal_sos = biquad.to_sos(
+            biquad.peak(self.sample_rate, 3000, 2, q=0.7)
+        ).astype(np.float32)
+        self._bass_sos = biquad.to_sos(
+            biquad.shelf(self.sample_rate, 150, 3)
+        ).astype(np.float32)
+        self._drums_sos = biquad.to_sos(
+            biquad.shelf(self.sample_rate, 5000, 2, high=True)
+        ).astype(np.float32)
+        
+        # Optionally load and warm up Demucs now so the first request doesn't
+        # pay for it (separation still loads lazily if this fails). Off by
+        # default: it probes CUDA at construction, which must not happen
+        # outside the GPU-decorated call on ZeroGPU
+        if config.get("models", {}).get("demucs", {}).get("eager_load", False):
+            try:
+                self.load_models()
+                self._warmup_demucs()
+            except Exception as e:
+                logger.warning(f"Eager Demucs load failed, loading on first use: {e}")
         
         logger.info(f"Audio Processor initialized - device: {self.device}")
     
+    def _board(self, name: str) -> Any:
+        """
+        Get an effect chain for the calling thread
+        
+        Boards are built once per thread and reused for every clip;
+        processing with reset=True clears their internal state between calls.
+        
+        Args:
+            name: Chain name (vocals, bass, drums, general)
+            
+        Returns:
+            Pedalboard instance
+        """
+        boards = getattr(self._thread_boards, 'boards', None)
+        if boards is None:
+            boards = self._build_boards()
+            self._thread_boards.boards = boards
+        return boards[name]
+    
+    def _enhance_pool(self) -> ThreadPoolExecutor:
+        """Get the enhancement thread pool, creating it on first use"""
+        if self._enhance_executor is None:
+            self._enhance_executor = ThreadPoolExecutor(
+                max_workers=self.enhance_workers, thread_name_prefix="lemm_enhance"
+            )
+        return self._enhance_executor
+    
+    def _build_boards(self) -> Dict[str, Any]:
+        """Build the Pedalboard effect chains"""
+        boards = {}
+        
+        # Vocal chain (presence boost EQ runs between the two boards)
+        boards['vocals_deess'] = Pedalboard([  # type: ignore
+            # De-esser (reduce sibilance)
+            Compressor(threshold_db=-24, ratio=8, attack_ms=0.1, release_ms=50),  # type: ignore
+        ])
+        boards['vocals'] = Pedalboard([  # type: ignore
+            # Gentle compression
+            Compressor(threshold_db=-18, ratio=3, attack_ms=5, release_ms=100),  # type: ignore
+            # Light reverb
+            Reverb(room_size=0.2, damping=0.7, wet_level=0.1),  # type: ignore
+            # Gain
+            Gain(gain_db=2)  # type: ignore
+        ])
+        
+        # Bass chain (after the low-shelf EQ)
+        boards['bass'] = Pedalboard([  # type: ignore
+            Compressor(threshold_db=-20, ratio=4),  # type: ignore
+            Gain(gain_db=2)  # type: ignore
+        ])
+        
+        # Drum chain (after the high-shelf EQ)
+        boards['drums'] = Pedalboard([  # type: ignore
+            Compressor(threshold_db=-18, ratio=6, attack_ms=1, release_ms=100),  # type: ignore
+            Gain(gain_db=1.5)  # type: ignore
+        ])
+        
+        # General chain
+        boards['general'] = Pedalboard([  # type: ignore
+            Compressor(threshold_db=-16, ratio=3),  # type: ignore
+            Reverb(room_size=0.25, damping=0.5, wet_level=0.15),  # type: ignore
+            Gain(gain_db=1)  # type: ignore
+        ])
+        
+        return boards
+    
     def load_models(self):
         """Load Demucs and so-vits-svc models"""
         try:
+            # Demucs is imported on first load to keep app startup light
+            from demucs.pretrained import get_model
+            
+            # Resolve the device on first use rather than at startup
+            self.device = get_device(self.device)
+            if self.device.startswith("cuda"):
+                # Demucs runs fixed-size segments, so cuDNN autotuning pays off
+                torch.backends.cudnn.benchmark = True
+            
             # Load Demucs
             logger.info(f"Loading Demucs model: {self.demucs_name}")
             self.demucs_model = get_model(self.demucs_name)
             self.demucs_model.to(self.device)
             self.demucs_model.eval()
+            self._stem_names = tuple(self.demucs_model.sources)  # type: ignore
             logger.info("Demucs model loaded successfully")
             
+            if self.device == "cpu" and self.demucs_onnx_path:
+                self._load_onnx_demucs()
+            else:
+                if self.device == "cpu" and self.demucs_int8:
+                    self._quantize_demucs()
+                if self.demucs_compile:
+                    self._compile_demucs()
+            
         except Exception as e:
             logger.error(f"Error loading models: {e}")
             raise
     
-    def process_clip(self, clip: np.ndarray, has_vocals: bool = True) -> Dict[str, np.ndarray]:
+    def _sub_models(self) -> List[torch.nn.Module]:
+        """Networks inside the loaded Demucs model (one unless it is a bag)"""
+        bag = self.demucs_model
+        return list(bag.models) if hasattr(bag, 'models') else [bag]  # type: ignore
+    
+    def _set_sub_model(self, idx: int, model: torch.nn.Module):
+        """Replace one network inside the loaded Demucs model"""
+        if hasattr(self.demucs_model, 'models'):
+            self.demucs_model.models[idx] = model  # type: ignore
+        else:
+            self.demucs_model = model
+    
+    @staticmethod
+    def _onnx_paths(onnx_path: str, count: int) -> List[str]:
+        """ONNX file per sub-model: the path itself, or path_<idx>.onnx for bags"""
+        if count == 1:
+            return [onnx_path]
+        base = Path(onnx_path)
+        return [str(base.with_name(f"{base.stem}_{idx}{base.suffix}")) for idx in range(count)]
+    
+    def export_onnx(self, onnx_path: str):
         """
-        Process audio clip: separate stems and enhance
+        Export the Demucs network(s) to ONNX for CPU inference
+        
+        Each network is traced on one training-length segment with a dynamic
+        batch axis. Only networks ONNX can express export: the hybrid models
+        (htdemucs) use a complex STFT that the exporter does not support.
+        Bags of models are written as path_<idx>.onnx.
         
         Args:
-            clip: Audio clip as numpy array
-            has_vocals: Whether the clip has vocals
-            
-        Returns:
-            Dictionary of enhanced stems
+            onnx_path: Output file path
         """
         try:
-            logger.info("Processing audio clip")
-            
-            # Load models if not loaded
             if self.demucs_model is None:
                 self.load_models()
             
-            # Step 1: Stem separation
-            stems = self.separate_stems(clip)
+            # torch >= 2.5 defaults to the dynamo exporter when asked; older
+            # versions only have the TorchScript exporter and no dynamo kwarg
+            export_options = {}
+            if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+                export_options["dynamo"] = False
+            
+            sub_models = self._sub_models()
+            for sub_model, path in zip(sub_models, self._onnx_paths(onnx_path, len(sub_models))):
+                segment_length = int(sub_model.segment * sub_model.samplerate)
+                if hasattr(sub_model, 'valid_length'):
+                    segment_length = sub_model.valid_length(segment_length)
+                dummy = torch.zeros((1, sub_model.audio_channels, segment_length), device=self.device)
+                torch.onnx.export(
+                    sub_model,
+                    (dummy,),
+                    path,
+                    input_names=["mix"],
+                    output_names=["sources"],
+                    dynamic_axes={"mix": {0: "batch"}, "sources": {0: "batch"}},
+                    opset_version=17,
+                    **export_options
+                )
+                logger.info(f"Exported Demucs to ONNX: {path}")
             
-            # Step 2: Enhance vocals if present
-            if has_vocals and 'vocals' in stems:
-                stems['vocals'] = self.enhance_vocals(stems['vocals'])
+        except Exception as e:
+            logger.error(f"Error exporting Demucs to ONNX: {e}")
+            raise
+    
+    def _load_onnx_demucs(self):
+        """Swap the Demucs network(s) for ONNX Runtime sessions"""
+        if not ONNXRUNTIME_AVAILABLE:
+            logger.warning("onnxruntime not available - install with: pip install onnxruntime")
+            return
+        
+        sub_models = self._sub_models()
+        paths = self._onnx_paths(self.demucs_onnx_path, len(sub_models))
+        missing = [path for path in paths if not Path(path).exists()]
+        if missing:
+            logger.warning(f"Demucs ONNX file(s) not found: {missing}, using PyTorch")
+            return
+        
+        try:
+            for idx, (sub_model, path) in enumerate(zip(sub_models, paths)):
+                self._set_sub_model(idx, _OnnxDemucs(sub_model, path))
+            logger.info(f"Demucs running on ONNX Runtime: {self.demucs_onnx_path}")
+        except Exception as e:
+            logger.warning(f"Failed to load Demucs ONNX model, using PyTorch: {e}")
+            for idx, sub_model in enumerate(sub_models):
+                self._set_sub_model(idx, sub_model)
+    
+    def _quantize_demucs(self):
+        """
+        Apply int8 dynamic quantization to the Demucs network(s) (CPU only)
+        
+        Dynamic quantization covers the Linear layers (the transformer in
+        the hybrid models); convolutions stay in float32. Each quantized
+        network is checked on one silent segment and dropped if it produces
+        non-finite output.
+        """
+        for idx, sub_model in enumerate(self._sub_models()):
+            try:
+                quantized = torch.ao.quantization.quantize_dynamic(
+                    sub_model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                segment_length = int(sub_model.segment * sub_model.samplerate)
+                if hasattr(sub_model, 'valid_length'):
+                    segment_length = sub_model.valid_length(segment_length)
+                with torch.inference_mode():
+                    check = quantized(torch.zeros((1, 2, segment_length)))
+                if not torch.isfinite(check).all():
+                    raise ValueError("non-finite output")
+            except Exception as e:
+                logger.warning(f"Demucs int8 quantization failed, keeping float32: {e}")
+                continue
+            
+            self._set_sub_model(idx, quantized)
+            logger.info("Demucs model quantized to int8")
+    
+    def _warmup_demucs(self, passes: int = 2):
+        """
+        Run a few dummy separations to initialise CUDA kernels
+        
+        Args:
+            passes: Number of warm-up forward passes
+        """
+        sub_model = self._sub_models()[0]
+        dummy = torch.zeros((1, 2, int(sub_model.segment * sub_model.samplerate)), device=self.device)
+        
+        with torch.inference_mode(), self._autocast():
+            for _ in range(passes):
+                _apply_vectorized(
+                    self.demucs_model, dummy, shifts=0, segment_batch=self.demucs_segment_batch
+                )
+        logger.info("Demucs warm-up complete")
+    
+    def _compile_demucs(self):
+        """
+        Compile the Demucs network(s) to cut Python dispatch overhead
+        
+        Uses torch.compile (reduce-overhead) and keeps the eager model if it
+        fails. A forward pass stacks up to segment_batch segments of every
+        clip in the call, and fewer at the tail, so the batch dimension is
+        compiled dynamic. The warm-up runs that dynamic graph at the largest
+        batch a call sends, plus batch 1, which dynamo always specialises;
+        failures and compile time surface here instead of on the first user
+        request.
+        """
+        max_batch = max(1, self.demucs_segment_batch) * max(1, self.pipeline_clips)
+        
+        for idx, sub_model in enumerate(self._sub_models()):
+            segment_length = int(sub_model.segment * sub_model.samplerate)
+            if hasattr(sub_model, 'valid_length'):
+                segment_length = sub_model.valid_length(segment_length)
+            
+            try:
+                compiled = torch.compile(sub_model, mode="reduce-overhead")
+                with torch.inference_mode(), self._autocast():
+                    # Inference tensors like the real inputs (guards check
+                    # it). Dynamo specialises sizes 0 and 1, so the dynamic
+                    # graph is traced with at least two rows
+                    dummies = [torch.zeros((max(2, max_batch), 2, segment_length), device=self.device)]
+                    torch._dynamo.mark_dynamic(dummies[0], 0)
+                    dummies.append(torch.zeros((1, 2, segment_length), device=self.device))
+                    for dummy in dummies:
+                        for _ in range(3):
+                            compiled(dummy)
+            except Exception as e:
+                logger.warning(f"Demucs torch.compile failed, keeping eager model: {e}")
+                continue
+            
+            self._set_sub_model(idx, compiled)
+            logger.info("Demucs model compiled with torch.compile")
+    
+    def process_clip(self, clip: np.ndarray, has_vocals: bool = True) -> Stems:
+        """
+        Process audio clip: separate stems and enhance
+        
+        Args:
+            clip: Audio clip as numpy array
+            has_vocals: Whether the clip has vocals
             
-            # Step 3: Enhance non-vocal stems
-            for stem_name in stems:
-                if stem_name != 'vocals':
-                    stems[stem_name] = self.enhance_non_vocal(stems[stem_name], stem_name)
+        Returns:
+            Enhanced stems
+        """
+        return self.process_clips([clip], [has_vocals])[0]
+    
+    def process_clips(self, clips: List[np.ndarray], has_vocals: List[bool]) -> List[Stems]:
+        """
+        Process several clips as a two-stage pipeline
+        
+        Separation runs on the calling thread in batches of pipeline_clips
+        clips, and each separated stem is handed to a CPU thread pool for
+        enhancement straight away, so Pedalboard work on one batch overlaps
+        with Demucs inference on the next.
+        
+        Args:
+            clips: Audio clips as numpy arrays
+            has_vocals: Whether each clip has vocals
             
-            return stems
+        Returns:
+            List of enhanced stems (one per clip)
+        """
+        try:
+            logger.info(f"Processing {len(clips)} audio clip(s)")
+            
+            # Instrumental clips skip Demucs entirely (nothing to isolate)
+            skip = [self.skip_separation_when_no_vocals and not v for v in has_vocals]
+            to_separate = [i for i, s in enumerate(skip) if not s]
+            all_stems: List[Stems] = [None] * len(clips)  # type: ignore
+            on_device = self._enhance_on_device()
+            
+            # (stems, stem name, future) for enhancement running on the pool;
+            # results are written back into the stem rows once done
+            pending: List[Tuple[Stems, str, Future]] = []
+            
+            pool = self._enhance_pool()
+            for i, clip in enumerate(clips):
+                if skip[i]:
+                    stems = self._instrumental_stems(clip)
+                    pending.append(
+                        (stems, 'other', pool.submit(self.enhance_non_vocal, stems['other'], 'other'))
+                    )
+                    all_stems[i] = stems
+            
+            batch_size = max(1, self.pipeline_clips)
+            for start in range(0, len(to_separate), batch_size):
+                indices = to_separate[start:start + batch_size]
+                
+                batch_clips = [clips[i] for i in indices]
+                
+                if on_device:
+                    # Steps 1-3 on the GPU: stems stay on the device until
+                    # they are enhanced, then cross to the host once
+                    try:
+                        separated = self._separate_batch(
+                            batch_clips, [has_vocals[i] for i in indices]
+                        )
+                        for i, stems in zip(indices, separated):
+                            all_stems[i] = stems
+                        continue
+                    except Exception as e:
+                        logger.warning(f"GPU enhancement failed: {e}, using Pedalboard")
+                
+                # Step 1: Stem separation (batched across clips)
+                separated = self.separate_stems_batch(batch_clips)
+                
+                for i, stems in zip(indices, separated):
+                    # Step 2: Enhance vocals if present
+                    if has_vocals[i] and 'vocals' in stems:
+                        pending.append(
+                            (stems, 'vocals', pool.submit(self.enhance_vocals, stems['vocals']))
+                        )
+                    
+                    # Step 3: Enhance non-vocal stems
+                    for stem_name in stems:
+                        if stem_name != 'vocals':
+                            pending.append((stems, stem_name, pool.submit(
+                                self.enhance_non_vocal, stems[stem_name], stem_name
+                            )))
+                    all_stems[i] = stems
+            
+            for stems, stem_name, future in pending:
+                stems[stem_name] = future.result()
+            
+            return all_stems
             
         except Exception as e:
             logger.error(f"Error processing clip: {e}")
             raise
     
-    def separate_stems(self, audio: np.ndarray) -> Dict[str, np.ndarray]:
+    def separate_stems(self, audio: np.ndarray) -> Stems:
         """
         Separate audio into stems using Demucs
         
@@ -101,72 +608,220 @@ class AudioProcessor:
             audio: Input audio
             
         Returns:
-            Dictionary of separated stems
+            Separated stems
         """
-        try:
-            logger.info("Separating stems with Demucs")
+        return self.separate_stems_batch([audio])[0]
+    
+    def separate_stems_batch(self, clips: List[np.ndarray]) -> List[Stems]:
+        """
+        Separate several clips into stems with a single Demucs call
+        
+        Clips are zero-padded to the longest one, stacked into a
+        (batch, channels, samples) tensor and trimmed back afterwards.
+        Equal-length clips (the usual case) separate exactly as they would
+        one at a time.
+        
+        Args:
+            clips: Input audio clips
             
-            # Load model if not loaded
-            if self.demucs_model is None:
-                self.load_models()
+        Returns:
+            List of separated stems (one per clip)
+        """
+        try:
+            return self._separate_batch(clips)
+        except Exception as e:
+            logger.error(f"Error separating stems: {e}")
+            # Fallback to mock stems
+            logger.warning("Falling back to mock stem separation")
+            return [self._mock_stems(audio) for audio in clips]
+    
+    def _separate_batch(self, clips: List[np.ndarray],
+                        has_vocals: Optional[List[bool]] = None) -> List[Stems]:
+        """
+        Run batched Demucs separation
+        
+        Args:
+            clips: Input audio clips
+            has_vocals: When given, stems are also enhanced on the device
+                (vocals only for clips flagged True) before the host copy
             
-            # Prepare audio tensor
-            # Demucs expects (batch, channels, samples)
-            if audio.ndim == 1:
-                # Mono to stereo
-                audio_tensor = torch.from_numpy(audio).float()
-                audio_tensor = torch.stack([audio_tensor, audio_tensor])  # Create stereo
+        Returns:
+            List of stems (one per clip)
+        """
+        from demucs.apply import apply_model
+        
+        logger.info(f"Separating stems with Demucs ({len(clips)} clip(s))")
+        
+        # Load model if not loaded
+        if self.demucs_model is None:
+            self.load_models()
+        
+        # Prepare audio tensor
+        # Demucs expects (batch, channels, samples)
+        lengths = [audio.shape[0] for audio in clips]
+        max_len = max(lengths)
+        # All-mono batches stage and upload one channel and are duplicated
+        # to stereo on the device
+        channels = 1 if all(audio.ndim == 1 for audio in clips) else 2
+        batch = self._input_buffer(len(clips), channels, max_len)
+        host = batch.numpy()
+        for i, audio in enumerate(clips):
+            # Copy channel by channel (mono goes to both) rather than via a
+            # transposed copy of the clip
+            for ch in range(channels):
+                np.copyto(host[i, ch, :lengths[i]], audio if audio.ndim == 1 else audio[:, ch])
+            host[i, :, lengths[i]:] = 0.0
+        
+        audio_tensor = batch.to(self.device, non_blocking=True)
+        if channels == 1:
+            audio_tensor = audio_tensor.expand(-1, 2, -1).contiguous()
+        
+        # Apply Demucs (split mode runs all segments in batched forwards)
+        logger.info(f"Running Demucs with shifts={self.demucs_shifts}")
+        with torch.inference_mode(), self._autocast():
+            if self.demucs_split:
+                sources = _apply_vectorized(
+                    self.demucs_model,
+                    audio_tensor,
+                    shifts=self.demucs_shifts,
+                    overlap=self.demucs_overlap,
+                    segment_batch=self.demucs_segment_batch
+                )
             else:
-                audio_tensor = torch.from_numpy(audio.T).float()
-            
-            # Add batch dimension
-            audio_tensor = audio_tensor.unsqueeze(0).to(self.device)
-            
-            # Apply Demucs
-            logger.info(f"Running Demucs with shifts={self.demucs_shifts}")
-            with torch.no_grad():
                 sources = apply_model(
                     self.demucs_model,  # type: ignore
                     audio_tensor,
                     shifts=self.demucs_shifts,
-                    split=self.demucs_split,
-                    overlap=0.25,
+                    split=False,
+                    overlap=self.demucs_overlap,
                     progress=False
-                )[0]  # Remove batch dimension
-            
-            # Convert sources to numpy
-            # sources shape: (stems, channels, samples)
-            sources = sources.cpu().numpy()
-            
-            # Get stem names from model
-            stem_names = self.demucs_model.sources  # type: ignore
-            
-            # Create dictionary of stems (convert to mono by averaging channels)
-            stems = {}
-            for i, name in enumerate(stem_names):
-                stem_audio = sources[i]  # (channels, samples)
-                # Convert to mono
-                if stem_audio.shape[0] == 2:
-                    stem_audio = stem_audio.mean(axis=0)
+                )
+        
+        # Convert to mono on the device before the transfer, so only one
+        # channel per stem crosses to the host
+        # sources shape: (batch, stems, channels, samples); cast back to
+        # float32 for Pedalboard in case autocast produced half precision
+        if sources.shape[2] == 2:
+            mono = sources.mean(dim=2, dtype=torch.float32)
+        else:
+            mono = sources[:, :, 0].float()
+        
+        # Drop the device copies before the transfer so the caching allocator
+        # can hand their blocks to the next batch
+        del sources, audio_tensor
+        
+        if has_vocals is not None:
+            self._enhance_batch_on_device(mono, self._stem_names, has_vocals)
+        mono = self._to_host(mono)
+        
+        # Stems per clip are (stems, samples) views into one array
+        results = [
+            Stems(mono[b, :, :length], self._stem_names)
+            for b, length in enumerate(lengths)
+        ]
+        
+        logger.info(f"Separated into stems: {list(self._stem_names)}")
+        
+        return results
+    
+    def _enhance_on_device(self) -> bool:
+        """Whether stems are enhanced with the torch chains instead of Pedalboard"""
+        if not self.gpu_enhancement or not get_device(self.device).startswith("cuda"):
+            return False
+        
+        if self._device_chains is None:
+            try:
+                from src.audio import torch_effects
+                self._device_chains = torch_effects.build_chains(self.sample_rate)
+            except ImportError as e:
+                logger.warning(f"torchaudio not available ({e}), using Pedalboard")
+                self.gpu_enhancement = False
+                return False
+        return True
+    
+    def _enhance_batch_on_device(self, mono: torch.Tensor, stem_names: Tuple[str, ...],
+                                 has_vocals: List[bool]):
+        """
+        Enhance separated stems in place on the device
+        
+        Args:
+            mono: Mono stems of shape (batch, stems, samples)
+            stem_names: Stem name for each row of the stems axis
+            has_vocals: Whether each clip has vocals
+        """
+        from src.audio.torch_effects import apply_chain
+        
+        with torch.inference_mode():
+            for s, stem_name in enumerate(stem_names):
+                if stem_name == 'vocals':
+                    rows = [b for b, v in enumerate(has_vocals) if v]
+                    if rows:
+                        mono[rows, s] = apply_chain(self._device_chains['vocals'], mono[rows, s])
                 else:
-                    stem_audio = stem_audio[0]
-                stems[name] = stem_audio
-            
-            logger.info(f"Separated into stems: {list(stems.keys())}")
-            
-            return stems
-            
-        except Exception as e:
-            logger.error(f"Error separating stems: {e}")
-            # Fallback to mock stems
-            logger.warning("Falling back to mock stem separation")
-            stems = {
-                'vocals': audio * 0.3,
-                'bass': audio * 0.25,
-                'drums': audio * 0.25,
-                'other': audio * 0.2
-            }
-            return stems
+                    chain = self._device_chains.get(stem_name, self._device_chains['general'])
+                    mono[:, s] = apply_chain(chain, mono[:, s].clone())
+    
+    def _input_buffer(self, batch_size: int, channels: int, length: int) -> torch.Tensor:
+        """
+        Get a (batch, channels, length) view of the reusable input staging buffer
+        
+        The buffer is pinned on CUDA so the upload is an async DMA, and only
+        reallocated when a larger input comes along. It is kept flat so every
+        view is contiguous and uploads without a host-side copy.
+        """
+        size = batch_size * channels * length
+        buffer = self._pinned_in
+        if buffer is None or buffer.numel() < size:
+            buffer = torch.empty(size, dtype=torch.float32, pin_memory=self.device.startswith("cuda"))
+            self._pinned_in = buffer
+        return buffer[:size].view(batch_size, channels, length)
+    
+    def _autocast(self):
+        """
+        Autocast context for Demucs inference
+        
+        Uses models.demucs.autocast_dtype ("fp16", "bf16" or "off"); only
+        enabled on CUDA, where half precision halves the memory traffic of
+        the convolution stack. Input stays float32 so the STFT runs at full
+        precision.
+        """
+        dtype = {"fp16": torch.float16, "bf16": torch.bfloat16}.get(self.demucs_autocast)
+        return torch.autocast(
+            device_type="cuda",
+            dtype=dtype or torch.float16,
+            enabled=dtype is not None and self.device.startswith("cuda")
+        )
+    
+    def _to_host(self, tensor: torch.Tensor) -> np.ndarray:
+        """
+        Copy a tensor to host memory as a numpy array
+        
+        On CUDA the copy goes through a pinned staging buffer so it runs as
+        an async DMA rather than a pageable-memory copy.
+        """
+        if not tensor.is_cuda:
+            return tensor.numpy()
+        
+        host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        host.copy_(tensor, non_blocking=True)
+        torch.cuda.current_stream().synchronize()
+        return host.numpy()
+    
+    def _instrumental_stems(self, clip: np.ndarray) -> Stems:
+        """Stems for an instrumental clip that bypasses separation"""
+        data = np.zeros((4, clip.shape[0]), dtype=np.float32)
+        if clip.ndim == 2:
+            np.mean(clip, axis=1, out=data[3])
+        else:
+            data[3] = clip
+        return Stems(data, ['vocals', 'bass', 'drums', 'other'])
+    
+    def _mock_stems(self, audio: np.ndarray) -> Stems:
+        """Fallback stems made of scaled copies of the input"""
+        # One broadcast multiply writes all four stems in a single pass
+        scales = np.array([0.3, 0.25, 0.25, 0.2], dtype=audio.dtype)
+        data = scales.reshape((4,) + (1,) * audio.ndim) * audio
+        return Stems(data, ['vocals', 'bass', 'drums', 'other'])
     
     def enhance_vocals(self, vocal_stem: np.ndarray) -> np.ndarray:
         """
@@ -193,29 +848,24 @@ class AudioProcessor:
             logger.info("Enhancing vocals (basic enhancement - so-vits-svc not fully integrated)")
             
             # Apply vocal-specific effects with Pedalboard
-            board = Pedalboard([  # type: ignore
-                # De-esser (reduce sibilance)
-                Compressor(threshold_db=-24, ratio=8, attack_ms=0.1, release_ms=50),  # type: ignore
-                # Presence boost
-                PeakFilter(cutoff_frequency_hz=3000, gain_db=2, q=0.7),  # type: ignore
-                # Gentle compression
-                Compressor(threshold_db=-18, ratio=3, attack_ms=5, release_ms=100),  # type: ignore
-                # Light reverb
-                Reverb(room_size=0.2, damping=0.7, wet_level=0.1),  # type: ignore
-                # Gain
-                Gain(gain_db=2)  # type: ignore
-            ])
-            
-            enhanced = board(vocal_stem, self.sample_rate)
-            enhanced = np.clip(enhanced, -1.0, 1.0)
+            deessed = self._board('vocals_deess').process(
+                vocal_stem, self.sample_rate, buffer_size=PEDALBOARD_BUFFER_SIZE, reset=True
+            )
+            boosted = sosfilt(self._vocal_sos, deessed, axis=0)
+            enhanced = self._board('vocals').process(
+                boosted, self.sample_rate, buffer_size=PEDALBOARD_BUFFER_SIZE, reset=True
+            )
+            enhanced = np.ascontiguousarray(enhanced, dtype=np.float32)
+            np.clip(enhanced, -1.0, 1.0, out=enhanced)
             
             logger.info("Vocal enhancement complete")
             return enhanced
             
         except Exception as e:
             logger.error(f"Error enhancing vocals: {e}")
-            # Fallback to slight boost
-            return np.clip(vocal_stem * 1.1, -1.0, 1.0)
+            # Fallback to slight boost (one output buffer, clipped in place)
+            boosted = np.multiply(vocal_stem, 1.1)
+            return np.clip(boosted, -1.0, 1.0, out=boosted)
     
     def enhance_non_vocal(self, stem: np.ndarray, stem_name: str) -> np.ndarray:
         """
@@ -257,14 +907,13 @@ class AudioProcessor:
                 return audio * 1.05
             
             # Create bass enhancement chain
-            board = Pedalboard([  # type: ignore
-                LowShelfFilter(cutoff_frequency_hz=150, gain_db=3),  # type: ignore
-                Compressor(threshold_db=-20, ratio=4),  # type: ignore
-                Gain(gain_db=2)  # type: ignore
-            ])
+            board = self._board('bass')
             
             # Apply effects
-            enhanced = board(audio, self.sample_rate)
+            enhanced = board.process(
+                sosfilt(self._bass_sos, audio, axis=0),
+                self.sample_rate, buffer_size=PEDALBOARD_BUFFER_SIZE, reset=True
+            )
             logger.info("Bass enhancement complete")
             return enhanced
             
@@ -280,14 +929,13 @@ class AudioProcessor:
                 return audio * 1.03
             
             # Create drum enhancement chain
-            board = Pedalboard([  # type: ignore
-                HighShelfFilter(cutoff_frequency_hz=5000, gain_db=2),  # type: ignore
-                Compressor(threshold_db=-18, ratio=6, attack_ms=1, release_ms=100),  # type: ignore
-                Gain(gain_db=1.5)  # type: ignore
-            ])
+            board = self._board('drums')
             
             # Apply effects
-            enhanced = board(audio, self.sample_rate)
+            enhanced = board.process(
+                sosfilt(self._drums_sos, audio, axis=0),
+                self.sample_rate, buffer_size=PEDALBOARD_BUFFER_SIZE, reset=True
+            )
             logger.info("Drum enhancement complete")
             return enhanced
             
@@ -303,14 +951,12 @@ class AudioProcessor:
                 return audio
             
             # Create general enhancement chain
-            board = Pedalboard([  # type: ignore
-                Compressor(threshold_db=-16, ratio=3),  # type: ignore
-                Reverb(room_size=0.25, damping=0.5, wet_level=0.15),  # type: ignore
-                Gain(gain_db=1)  # type: ignore
-            ])
+            board = self._board('general')
             
             # Apply effects
-            enhanced = board(audio, self.sample_rate)
+            enhanced = board.process(
+                audio, self.sample_rate, buffer_size=PEDALBOARD_BUFFER_SIZE, reset=True
+            )
             logger.info("General enhancement complete")
             return enhanced
             
@@ -319,14 +965,27 @@ class AudioProcessor:
             logger.exception("Full traceback:")
             return audio * 1.0
     
-    def unload_models(self):
-        """Unload models to free memory"""
+    def unload_models(self, keep_warm: bool = False):
+        """
+        Unload models to free memory
+        
+        Args:
+            keep_warm: Keep the CUDA caching allocator's blocks (skip
+                empty_cache) when the processor will be used again
+        """
         try:
             if self.demucs_model is not None:
                 del self.demucs_model
                 self.demucs_model = None
+            
+            # Worker threads (and their effect chains) go with the pool
+            if self._enhance_executor is not None:
+                self._enhance_executor.shutdown(wait=True)
+                self._enhance_executor = None
                 
-            if torch.cuda.is_available():
+            # empty_cache synchronizes the device, so it only runs here and
+            # never on the per-clip path
+            if not keep_warm and cuda_available():
                 torch.cuda.empty_cache()
                 
             logger.info("Audio processor models unloaded")
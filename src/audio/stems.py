@@ -0,0 +1,46 @@
+"""
+Container for separated stems
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterator, Sequence
+import numpy as np
+
+
+class Stems(Mapping):
+    """
+    Separated stems stored as one (num_stems, samples) array
+
+    Behaves as a read/write mapping of stem name to mono audio. Every value
+    is a row view into ``data``, so the stems of a clip share one contiguous
+    buffer; assigning a stem copies the new audio into its row.
+    """
+
+    def __init__(self, data: np.ndarray, names: Sequence[str]):
+        """
+        Wrap a stem array
+
+        Args:
+            data: Mono stems of shape (num_stems, samples)
+            names: Stem name for each row of data
+        """
+        self.data = data
+        self.stem_index = {name: i for i, name in enumerate(names)}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.data[self.stem_index[name]]
+
+    def __setitem__(self, name: str, audio: np.ndarray):
+        np.copyto(self.data[self.stem_index[name]], audio)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.stem_index)
+
+    def __len__(self) -> int:
+        return len(self.stem_index)
+
+    def __repr__(self) -> str:
+        return f"Stems({list(self.stem_index)}, samples={self.data.shape[-1]})"
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """Plain dictionary of stem name to audio (views into data)"""
+        return {name: self.data[i] for name, i in self.stem_index.items()}
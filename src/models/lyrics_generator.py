@@ -1,10 +1,47 @@
 """
 Lyrics Generator using SongComposer or similar models
 """
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, List, Optional
 from loguru import logger
 
 
+# Selects the "life" theme when "life" appears anywhere in the prompt
+# (case-insensitive substring, without lower-casing a copy of the prompt)
+_LIFE_THEME_RE = re.compile("life", re.IGNORECASE)
+
+# Placeholder song, built once; only the theme word varies per call.
+# The chorus is written once and spliced in at import.
+_CHORUS = """[Chorus]
+We're dancing in the moment now
+Letting go of fear and doubt
+Hearts beating to the rhythm strong
+This is where we all belong
+"""
+
+_PLACEHOLDER_TEMPLATE = """[Verse 1]
+Walking down this winding road
+Carrying dreams like heavy loads
+The {theme} keeps calling out to me
+A melody of what could be
+
+{chorus}
+[Verse 2]
+Every step a story told
+Memories worth more than gold
+The future's bright, the past is clear
+We're living now, we're living here
+
+{chorus}
+[Bridge]
+Hold on tight, don't let it fade
+This beautiful sound we've made
+Together we can find our way
+In this song, we're here to stay
+
+{chorus}""".replace("{chorus}", _CHORUS)
+
+
 class LyricsGenerator:
     """Generates song lyrics based on prompts and musical analysis"""
     
@@ -35,7 +72,7 @@ class LyricsGenerator:
             # TODO: Implement actual SongComposer integration
             # For now, return placeholder lyrics
             
-            logger.info(f"Generating lyrics for prompt: {prompt}")
+            logger.info("Generating lyrics for prompt: {}", prompt)
             
             # Placeholder implementation
             lyrics = self._generate_placeholder_lyrics(prompt)
@@ -43,9 +80,24 @@ class LyricsGenerator:
             return lyrics
             
         except Exception as e:
-            logger.error(f"Error generating lyrics: {e}")
+            logger.error("Error generating lyrics: {}", e)
             raise
     
+    def generate_batch(self, prompts: List[str], analysis: Optional[str] = None) -> List[str]:
+        """
+        Generate lyrics for several prompts
+        
+        Args:
+            prompts: User text prompts (e.g. variations of one song idea)
+            analysis: Analyzed musical attributes shared by all prompts
+            
+        Returns:
+            Generated lyrics, in the order of prompts
+        """
+        # Placeholder generation is pure Python, so threads would only
+        # contend for the GIL
+        return [self.generate(prompt, analysis) for prompt in prompts]
+    
     def _generate_placeholder_lyrics(self, prompt: str) -> str:
         """
         Generate placeholder lyrics (to be replaced with actual model)
@@ -57,44 +109,9 @@ class LyricsGenerator:
             Placeholder lyrics
         """
         # Extract theme from prompt
-        theme = "life" if "life" in prompt.lower() else "music"
+        theme = "life" if _LIFE_THEME_RE.search(prompt) else "music"
         
-        return f"""[Verse 1]
-Walking down this winding road
-Carrying dreams like heavy loads
-The {theme} keeps calling out to me
-A melody of what could be
-
-[Chorus]
-We're dancing in the moment now
-Letting go of fear and doubt
-Hearts beating to the rhythm strong
-This is where we all belong
-
-[Verse 2]
-Every step a story told
-Memories worth more than gold
-The future's bright, the past is clear
-We're living now, we're living here
-
-[Chorus]
-We're dancing in the moment now
-Letting go of fear and doubt
-Hearts beating to the rhythm strong
-This is where we all belong
-
-[Bridge]
-Hold on tight, don't let it fade
-This beautiful sound we've made
-Together we can find our way
-In this song, we're here to stay
-
-[Chorus]
-We're dancing in the moment now
-Letting go of fear and doubt
-Hearts beating to the rhythm strong
-This is where we all belong
-"""
+        return _PLACEHOLDER_TEMPLATE.format(theme=theme)
     
     def load_model(self):
         """Load SongComposer model"""
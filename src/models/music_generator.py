@@ -2,39 +2,64 @@
 Music Generator using ACE-Step and MusicControlNet
 ZeroGPU Compatible Version
 """
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+import importlib.util
+import os
+import random
+import tempfile
+import threading
 import numpy as np
 import torch
 from pathlib import Path
 from loguru import logger
-import soundfile as sf
 
-# ZeroGPU support
-try:
-    import spaces
-    ZEROGPU_AVAILABLE = True
+from src.utils.device import cuda_available
+
+# ZeroGPU support; spaces is only imported when installed
+ZEROGPU_AVAILABLE = importlib.util.find_spec("spaces") is not None
+if ZEROGPU_AVAILABLE:
     logger.info("ZeroGPU support enabled")
-except ImportError:
-    ZEROGPU_AVAILABLE = False
-    # Create dummy decorator if not available
-    def spaces_decorator(*args, **kwargs):
-        def decorator(func):
-            return func
-        return decorator if args and callable(args[0]) else decorator
-    spaces = type('spaces', (), {'GPU': spaces_decorator})()  # type: ignore
+
+
+def _gpu(duration: int):
+    """
+    Request a ZeroGPU slot for the decorated function
+    
+    Args:
+        duration: Maximum GPU time in seconds
+        
+    Returns:
+        spaces.GPU decorator, or a no-op decorator without spaces
+    """
+    if not ZEROGPU_AVAILABLE:
+        return lambda func: func
+    
+    import spaces
+    return spaces.GPU(duration=duration)
 
 # Import ACE-Step pipeline
 if TYPE_CHECKING:
     from acestep.pipeline_ace_step import ACEStepPipeline
 
-try:
-    from acestep.pipeline_ace_step import ACEStepPipeline
-    ACESTEP_AVAILABLE = True
-except ImportError:
-    ACESTEP_AVAILABLE = False
-    ACEStepPipeline = None  # type: ignore
+# Only probe for the package here; the pipeline module (and the model stack
+# it pulls in) is imported when the models are loaded
+ACESTEP_AVAILABLE = importlib.util.find_spec("acestep") is not None
+if not ACESTEP_AVAILABLE:
     logger.warning("ACE-Step not available - install with: pip install git+https://github.com/ACE-Step/ACE-Step.git")
 
+TORCHAO_AVAILABLE = importlib.util.find_spec("torchao") is not None
+
+# Loaded (and compiled/warmed) pipelines shared by every MusicGenerator in the
+# process, keyed by the settings that change what load_models builds
+_ACE_PIPELINE_CACHE: Dict[tuple, Any] = {}
+
+# Decoded waveforms of the pipeline call running on this thread (set by
+# MusicGenerator._decoded_audio); the cached pipeline is shared, so the
+# capture target cannot live on it
+_DECODE_CAPTURE = threading.local()
+
 
 class MusicGenerator:
     """Generates music clips using ACE-Step and MusicControlNet"""
@@ -55,18 +80,33 @@ class MusicGenerator:
         self.use_local = config.get("models", {}).get("ace_step", {}).get("use_local", False)
         self.num_inference_steps = config.get("models", {}).get("ace_step", {}).get("num_inference_steps", 27)
         self.guidance_scale = config.get("models", {}).get("ace_step", {}).get("guidance_scale", 7.5)
+        self.max_batch_clips = config.get("models", {}).get("ace_step", {}).get("max_batch_clips", 4)
+        
+        # Private seed source (seeded from os.urandom), independent of the global RNG
+        self._rng_cpu = random.Random()
+        
+        # LoRA loaded into self.pipeline (part of its cache key)
+        self._lora_path: Optional[str] = None
         
         logger.info(f"Music Generator initialized - device: {self.device}")
         
-    def load_models(self):
-        """Load ACE-Step model"""
+    def load_models(self, lora_path: Optional[str] = None):
+        """
+        Load ACE-Step model
+        
+        Args:
+            lora_path: LoRA weights to load into the pipeline. A LoRA changes
+                the weights in place, so each one gets its own cached pipeline
+        """
         if not ACESTEP_AVAILABLE:
             error_msg = "ACE-Step is not installed. Install with: pip install git+https://github.com/ACE-Step/ACE-Step.git"
             logger.error(error_msg)
             raise ImportError(error_msg)
         
-        if ACEStepPipeline is None:
-            error_msg = "ACEStepPipeline class is not available"
+        try:
+            from acestep.pipeline_ace_step import ACEStepPipeline
+        except ImportError as e:
+            error_msg = f"ACEStepPipeline class is not available: {e}"
             logger.error(error_msg)
             raise ImportError(error_msg)
         
@@ -76,13 +116,23 @@ class MusicGenerator:
             # Get ACE-Step specific config
             ace_config = self.config.get("models", {}).get("ace_step", {})
             bf16 = ace_config.get("bf16", True)
-            torch_compile = ace_config.get("torch_compile", False)
+            # Opt-in: the graphs are static, so new prompt/lyric token lengths
+            # and batch sizes recompile on first use
+            torch_compile = ace_config.get("torch_compile", False) and cuda_available()
+            quantize_int8 = ace_config.get("quantize_int8", False)
             cpu_offload = ace_config.get("cpu_offload", False)
             overlapped_decode = ace_config.get("overlapped_decode", False)
             device_id = ace_config.get("device_id", 0)
+            warmup = ace_config.get("warmup", True)
+            
+            # Generation shapes are fixed per run: let cuDNN autotune once and
+            # allow TF32 for the remaining fp32 matmuls
+            if cuda_available():
+                torch.backends.cudnn.benchmark = True
+                torch.set_float32_matmul_precision("high")
             
             # Determine dtype
-            if bf16 and torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            if bf16 and cuda_available() and torch.cuda.is_bf16_supported():
                 dtype = torch.bfloat16
                 logger.info("Using bfloat16 precision")
             elif self.device == "cuda":
@@ -92,17 +142,57 @@ class MusicGenerator:
                 dtype = torch.float32
                 logger.info("Using float32 precision")
             
+            cache_key = (
+                self.model_path, dtype, device_id, torch_compile, quantize_int8,
+                cpu_offload, overlapped_decode, lora_path
+            )
+            cached = _ACE_PIPELINE_CACHE.get(cache_key)
+            if cached is not None:
+                self.pipeline = cached
+                self._lora_path = lora_path
+                logger.info("Reusing loaded ACE-Step pipeline")
+                return
+            
             # Load ACE-Step pipeline with proper parameters
             logger.info("Loading ACE-Step pipeline (this may take 1-2 minutes)...")
             
-            self.pipeline = ACEStepPipeline(  # type: ignore
+            # Compilation is done here per module rather than by the pipeline
+            self.pipeline = ACEStepPipeline(
                 checkpoint_dir=self.model_path,
                 dtype=dtype,
-                torch_compile=torch_compile,
+                torch_compile=False,
                 cpu_offload=cpu_offload,
                 overlapped_decode=overlapped_decode,
                 device_id=device_id
             )
+            self._load_checkpoint()
+            if lora_path:
+                self._apply_lora(lora_path)
+            self._lora_path = lora_path
+            self._cache_text_embeddings()
+            self._capture_decoded_audio()
+            
+            # NHWC weights suit the tensor-core conv kernels of the DCAE
+            # decoder and the transformer's conv layers (only 4-D weights change)
+            if cuda_available():
+                for name in ("music_dcae", "ace_step_transformer"):
+                    module = getattr(self.pipeline, name, None)
+                    if module is not None:
+                        module.to(memory_format=torch.channels_last)
+            
+            # Quantize before compiling so the int8 weights are traced
+            if quantize_int8:
+                self._quantize_transformer()
+            
+            if torch_compile:
+                self._compile_transformer(cpu_offload)
+                self._compile_decoder(cpu_offload)
+                self._compile_text_encoder()
+            
+            if warmup and cuda_available():
+                self._warmup()
+            
+            _ACE_PIPELINE_CACHE[cache_key] = self.pipeline
             
             logger.info("ACE-Step model loaded successfully")
             logger.info(f"  - Device: cuda:{device_id}")
@@ -121,7 +211,201 @@ class MusicGenerator:
             logger.error("    └── umt5-base/")
             raise
     
-    @spaces.GPU(duration=120)  # Request GPU for 2 minutes for generation
+    def _load_checkpoint(self):
+        """Load the pipeline weights now instead of on its first call"""
+        if getattr(self.pipeline, "loaded", True):
+            return
+        
+        if getattr(self.pipeline, "quantized", False):
+            self.pipeline.load_quantized_checkpoint(self.pipeline.checkpoint_dir)  # type: ignore
+        else:
+            self.pipeline.load_checkpoint(self.pipeline.checkpoint_dir)  # type: ignore
+    
+    def _cache_text_embeddings(self):
+        """
+        Memoise the pipeline's umt5 prompt encoding
+        
+        Every clip of a song uses the same prompt, so the text encoder only
+        has to run once per song. ACE-Step takes no precomputed embeddings,
+        so its encoding methods are wrapped on the pipeline instance; the
+        cache goes away with the pipeline.
+        """
+        for name in ("get_text_embeddings", "get_text_embeddings_null"):
+            encode = getattr(self.pipeline, name, None)
+            if encode is None:
+                continue
+            
+            @lru_cache(maxsize=32)
+            def encode_cached(texts, *args, _encode=encode, **kwargs):
+                return _encode(list(texts), *args, **kwargs)
+            
+            def encode_texts(texts, *args, _cached=encode_cached, **kwargs):
+                return _cached(tuple(texts), *args, **kwargs)
+            
+            setattr(self.pipeline, name, encode_texts)
+    
+    def _capture_decoded_audio(self):
+        """
+        Keep decoded waveforms in memory instead of round-tripping files
+        
+        ACEStepPipeline.__call__ hands each decoded clip to save_wav_file
+        and returns the written paths. Inside a _decoded_audio block the
+        wrapper installed here collects the waveform tensor for that call and
+        skips the audio encode; only the pipeline's small parameters JSON is
+        still written, into the block's temporary directory. Outside one it
+        defers to the pipeline's own save_wav_file.
+        """
+        save_original = getattr(self.pipeline, "save_wav_file", None)
+        if save_original is None:
+            return
+        
+        def save_wav_file(target_wav, idx, save_path=None, sample_rate=48000, format="flac"):
+            capture = getattr(_DECODE_CAPTURE, "active", None)
+            if capture is None:
+                return save_original(target_wav, idx, save_path, sample_rate, format)
+            
+            decoded, out_dir = capture
+            decoded.append((target_wav, sample_rate))
+            return os.path.join(out_dir, f"output_{idx}.{format}")
+        
+        self.pipeline.save_wav_file = save_wav_file  # type: ignore
+    
+    @contextmanager
+    def _decoded_audio(self):
+        """
+        Collect the waveforms decoded by pipeline calls made in this block
+        
+        The buffer and its temporary directory belong to the block, so
+        generators sharing a cached pipeline from other threads never see
+        each other's audio; the directory is removed on exit.
+        
+        Yields:
+            List of (waveform, sample_rate) tuples, filled by the pipeline
+        """
+        decoded: list = []
+        with tempfile.TemporaryDirectory(prefix="lemm_ace_step_") as out_dir:
+            _DECODE_CAPTURE.active = (decoded, out_dir)
+            try:
+                yield decoded
+            finally:
+                _DECODE_CAPTURE.active = None
+    
+    def _compile_transformer(self, cpu_offload: bool = False):
+        """
+        Compile the ACE-Step transformer for the denoising loop
+        
+        reduce-overhead mode replays the per-step kernels as a CUDA graph.
+        Shapes are kept static, so every new text/lyric token length or
+        batch size triggers a recompile; only worth it for steady workloads.
+        
+        Args:
+            cpu_offload: Whether weights move between host and device, in
+                which case CUDA graphs cannot be used
+        """
+        if not hasattr(self.pipeline, "ace_step_transformer"):
+            logger.warning("Pipeline has no ace_step_transformer, skipping torch.compile")
+            return
+        
+        try:
+            self.pipeline.ace_step_transformer = torch.compile(  # type: ignore
+                self.pipeline.ace_step_transformer,  # type: ignore
+                mode="default" if cpu_offload else "reduce-overhead",
+                fullgraph=False,
+                dynamic=False
+            )
+            logger.info("Compiled ACE-Step transformer (reduce-overhead)")
+        except Exception as e:
+            logger.warning(f"torch.compile failed, using eager transformer: {e}")
+    
+    def _quantize_transformer(self):
+        """
+        Quantize the ACE-Step transformer's linear weights to INT8
+        
+        The denoising loop is bound by weight bandwidth, so int8 weights
+        roughly halve it. Activations stay in the pipeline dtype.
+        """
+        if not TORCHAO_AVAILABLE:
+            logger.warning("quantize_int8 is set but torchao is not installed - install with: pip install torchao")
+            return
+        if not cuda_available() or not hasattr(self.pipeline, "ace_step_transformer"):
+            logger.warning("INT8 quantization needs CUDA and an ace_step_transformer, skipping")
+            return
+        
+        try:
+            from torchao.quantization import quantize_, int8_weight_only
+            
+            quantize_(self.pipeline.ace_step_transformer, int8_weight_only())  # type: ignore
+            logger.info("Applied INT8 weight-only quantization to ACE-Step transformer")
+        except Exception as e:
+            logger.warning(f"INT8 quantization failed, using unquantized transformer: {e}")
+    
+    def _compile_text_encoder(self):
+        """
+        Compile the umt5 text encoder with a dynamic sequence length
+        
+        Prompt token count is the only shape that changes between runs, so
+        only that axis is marked dynamic (on a dummy batch traced here) and
+        new prompts reuse the same graph instead of recompiling. Every other
+        module stays static.
+        """
+        encoder = getattr(self.pipeline, "text_encoder_model", None)
+        if encoder is None:
+            logger.warning("Pipeline has no text_encoder_model, skipping text encoder compile")
+            return
+        
+        try:
+            compiled = torch.compile(encoder)
+            device = next(encoder.parameters()).device
+            
+            # Traced under inference_mode like the generation calls, so the
+            # grad-mode guard matches
+            with torch.inference_mode():
+                input_ids = torch.ones((1, 8), dtype=torch.long, device=device)
+                attention_mask = torch.ones_like(input_ids)
+                torch._dynamo.mark_dynamic(input_ids, 1)
+                torch._dynamo.mark_dynamic(attention_mask, 1)
+                compiled(input_ids=input_ids, attention_mask=attention_mask)
+            
+            self.pipeline.text_encoder_model = compiled  # type: ignore
+            logger.info("Compiled umt5 text encoder (dynamic sequence length)")
+        except Exception as e:
+            logger.warning(f"Text encoder compile failed, using eager encoder: {e}")
+    
+    def _compile_decoder(self, cpu_offload: bool = False):
+        """
+        Cast the DCAE decoder and vocoder to bf16 and compile them
+        
+        Decoding runs once per clip on a fixed 32s shape, so it is captured
+        as a CUDA graph like the transformer. The bf16 cast is only applied
+        when the pipeline itself runs in bf16, so decode inputs match.
+        
+        Args:
+            cpu_offload: Whether weights move between host and device
+        """
+        music_dcae = getattr(self.pipeline, "music_dcae", None)
+        if music_dcae is None:
+            logger.warning("Pipeline has no music_dcae, skipping decoder compile")
+            return
+        
+        mode = "default" if cpu_offload else "reduce-overhead"
+        try:
+            if getattr(self.pipeline, "dtype", None) == torch.bfloat16:
+                music_dcae.to(torch.bfloat16)
+            
+            # MusicDCAE.decode calls these directly rather than its forward
+            dcae = getattr(music_dcae, "dcae", None)
+            if dcae is not None and hasattr(dcae, "decoder"):
+                dcae.decoder = torch.compile(dcae.decoder, mode=mode, dynamic=False)
+            
+            vocoder = getattr(music_dcae, "vocoder", None)
+            if vocoder is not None and hasattr(vocoder, "decode"):
+                vocoder.decode = torch.compile(vocoder.decode, mode=mode, dynamic=False)
+            
+            logger.info(f"Compiled DCAE decoder and vocoder ({mode})")
+        except Exception as e:
+            logger.warning(f"Decoder compile failed, using eager decoder: {e}")
+    
+    @_gpu(duration=120)  # Request GPU for 2 minutes for generation
     def generate_clip(
         self,
         prompt: str,
@@ -150,15 +434,13 @@ class MusicGenerator:
             Generated audio as numpy array
         """
         try:
-            logger.info(f"Generating clip {clip_index + 1}")
+            logger.debug("Generating clip {}", clip_index + 1)
             
-            # Load model if not loaded
-            if self.pipeline is None:
-                self.load_models()
-            
-            # Apply LoRA if requested
-            if use_lora and lora_path:
-                self._apply_lora(lora_path)
+            # Load model if not loaded, or if the requested LoRA differs from
+            # the one in the current pipeline
+            lora = lora_path if use_lora and lora_path else None
+            if self.pipeline is None or lora != self._lora_path:
+                self.load_models(lora_path=lora)
             
             # Build the full prompt with musical attributes
             full_prompt = self._build_prompt(prompt, lyrics, analysis)
@@ -166,7 +448,8 @@ class MusicGenerator:
             # Generate conditioning from previous clip if available
             conditioning = None
             if previous_clip is not None:
-                conditioning = self._generate_conditioning(previous_clip)
+                # No copy when it is already contiguous (the usual case)
+                conditioning = self._generate_conditioning(np.ascontiguousarray(previous_clip))
             
             # Generate clip with ACE-Step
             clip = self._generate_with_ace_step(
@@ -186,6 +469,65 @@ class MusicGenerator:
             logger.error(f"Error generating clip: {e}")
             raise
     
+    @_gpu(duration=300)  # Request GPU for 5 minutes for a batched song
+    def generate_clips(
+        self,
+        prompt: str,
+        lyrics: str,
+        num_clips: int,
+        analysis: Dict[str, Any],
+        use_lora: bool = False,
+        lora_path: Optional[str] = None,
+        temperature: float = 1.0
+    ) -> List[np.ndarray]:
+        """
+        Generate several clips for one prompt in batched pipeline calls
+        
+        All clips share the prompt and lyrics, so they run as one ACE-Step
+        batch (up to max_batch_clips per call) with a seed each, sharing
+        the text encoding and amortizing per-step launch overhead. Clips
+        are not conditioned on each other.
+        
+        Args:
+            prompt: User's text prompt
+            lyrics: Lyrics for the clips (empty for instrumental)
+            num_clips: Number of clips to generate
+            analysis: Musical analysis from prompt
+            use_lora: Whether to use LoRA weights
+            lora_path: Path to LoRA weights
+            temperature: Generation temperature
+            
+        Returns:
+            List of generated clips as numpy arrays
+        """
+        try:
+            logger.debug("Generating {} clips", num_clips)
+            
+            # Load model if not loaded, or if the requested LoRA differs from
+            # the one in the current pipeline
+            lora = lora_path if use_lora and lora_path else None
+            if self.pipeline is None or lora != self._lora_path:
+                self.load_models(lora_path=lora)
+            
+            full_prompt = self._build_prompt(prompt, lyrics, analysis)
+            
+            clips = []
+            batch_size = max(1, self.max_batch_clips)
+            for start in range(0, num_clips, batch_size):
+                batch = self._generate_batch_with_ace_step(
+                    prompt=full_prompt,
+                    lyrics=lyrics,
+                    temperature=temperature,
+                    num_clips=min(batch_size, num_clips - start)
+                )
+                clips.extend(self._structure_clip(clip) for clip in batch)
+            
+            return clips
+            
+        except Exception as e:
+            logger.error(f"Error generating clips: {e}")
+            raise
+    
     def _build_prompt(self, prompt: str, lyrics: str, analysis: Dict[str, Any]) -> str:
         """
         Build comprehensive prompt from user input and analysis
@@ -199,13 +541,58 @@ class MusicGenerator:
             Enhanced prompt string
         """
         # Extract key attributes
-        genre = analysis.get('genre', 'pop')
-        style = analysis.get('style', 'modern')
-        mood = analysis.get('mood', 'neutral')
         tempo = analysis.get('tempo', 120)
-        instruments = analysis.get('instruments', [])
+        if not tempo:
+            tempo_bucket = None
+        elif tempo < 90:
+            tempo_bucket = "slow"
+        elif tempo > 140:
+            tempo_bucket = "fast"
+        else:
+            tempo_bucket = "medium"
+        
+        full_prompt = self._build_prompt_cached(
+            prompt,
+            bool(lyrics),
+            analysis.get('genre', 'pop'),
+            analysis.get('style', 'modern'),
+            analysis.get('mood', 'neutral'),
+            tempo_bucket,
+            tuple(analysis.get('instruments', []))
+        )
+        
+        logger.debug("Built prompt: {}", full_prompt)
+        return full_prompt
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _build_prompt_cached(
+        prompt: str,
+        has_vocals: bool,
+        genre: str,
+        style: str,
+        mood: str,
+        tempo_bucket: Optional[str],
+        instruments: Tuple[str, ...]
+    ) -> str:
+        """
+        Build the prompt string from hashable analysis fields
         
-        # Build detailed prompt
+        The song-level analysis is the same for every clip, so this is
+        memoised across the clip loop.
+        
+        Args:
+            prompt: Original user prompt
+            has_vocals: Whether the clip has lyrics
+            genre: Genre name
+            style: Style name
+            mood: Mood name
+            tempo_bucket: "slow", "medium", "fast" or None for no tempo
+            instruments: Instrument names
+            
+        Returns:
+            Enhanced prompt string
+        """
         parts = []
         
         # Add genre and style
@@ -218,13 +605,8 @@ class MusicGenerator:
             parts.append(f"{mood} mood")
         
         # Add tempo
-        if tempo:
-            if tempo < 90:
-                parts.append("slow tempo")
-            elif tempo > 140:
-                parts.append("fast tempo")
-            else:
-                parts.append("medium tempo")
+        if tempo_bucket:
+            parts.append(f"{tempo_bucket} tempo")
         
         # Add instruments
         if instruments:
@@ -232,7 +614,7 @@ class MusicGenerator:
             parts.append(f"with {inst_str}")
         
         # Add vocal info
-        if lyrics:
+        if has_vocals:
             parts.append("with vocals")
         else:
             parts.append("instrumental")
@@ -242,7 +624,6 @@ class MusicGenerator:
         if prompt:
             full_prompt = f"{prompt}. {full_prompt}"
         
-        logger.info(f"Built prompt: {full_prompt}")
         return full_prompt
     
     def _generate_with_ace_step(
@@ -259,66 +640,76 @@ class MusicGenerator:
         Returns:
             Generated audio array
         """
+        return self._generate_batch_with_ace_step(prompt, lyrics, temperature, num_clips=1)[0]
+    
+    def _generate_batch_with_ace_step(
+        self,
+        prompt: str,
+        lyrics: str,
+        temperature: float,
+        num_clips: int
+    ) -> List[np.ndarray]:
+        """
+        Generate a batch of clips for one prompt in a single ACE-Step call
+        
+        Args:
+            prompt: Full generation prompt
+            lyrics: Lyrics (empty for instrumental)
+            temperature: Generation temperature
+            num_clips: Batch size
+            
+        Returns:
+            List of generated audio arrays
+        """
         try:
             if self.pipeline is None:
                 error_msg = "Pipeline not loaded. Call load_models() first."
                 logger.error(error_msg)
                 raise RuntimeError(error_msg)
             
-            logger.info("Generating audio with ACE-Step")
-            
             # ACE-Step parameters
             duration = self.clip_duration  # 32 seconds
             
-            # Generate seed for reproducibility
-            import random
-            seed = random.randint(0, 2**32 - 1)
+            # Generate seeds for reproducibility. Drawn on the host: the
+            # pipeline seeds its torch.Generators from Python ints, so a
+            # device-side seed pool would only add a D2H read per clip
+            seeds = [self._rng_cpu.randrange(2**32) for _ in range(num_clips)]
             
             # Build ACE-Step generation call
             # ACE-Step API: pipeline(prompt, lyrics, audio_duration, infer_step, guidance_scale, ...)
-            logger.info(f"ACE-Step generating {duration}s audio")
-            logger.info(f"  - Prompt: {prompt[:100]}...")
-            logger.info(f"  - Lyrics: {'Yes' if lyrics else 'No'}")
-            logger.info(f"  - Steps: {self.num_inference_steps}")
-            logger.info(f"  - Guidance: {self.guidance_scale}")
-            logger.info(f"  - Seed: {seed}")
-            
-            # Call ACE-Step pipeline
-            audio = self.pipeline(  # type: ignore
-                prompt=prompt,
-                lyrics=lyrics if lyrics else "",
-                audio_duration=duration,
-                infer_step=self.num_inference_steps,
-                guidance_scale=self.guidance_scale * temperature,
-                manual_seeds=[seed],
-                scheduler_type="FLOW",  # ACE-Step's scheduler type
-                cfg_type="TRIANGULAR"   # CFG type for ACE-Step
+            logger.debug(
+                "ACE-Step generating {} x {}s audio - prompt: {:.100}, lyrics: {}, steps: {}, guidance: {}",
+                num_clips, duration, prompt, bool(lyrics), self.num_inference_steps, self.guidance_scale
             )
             
-            logger.info("Audio generation complete")
-            
-            # ACE-Step returns audio as numpy array
-            if isinstance(audio, torch.Tensor):
-                audio = audio.cpu().numpy()
-            
-            # Ensure correct shape (mono or stereo)
-            if audio.ndim == 2:
-                # Already stereo or batch dimension
-                if audio.shape[0] == 2:
-                    audio = audio.T  # Transpose to (samples, channels)
-                elif audio.shape[1] == 2:
-                    pass  # Already (samples, channels)
-                else:
-                    # Take first channel
-                    audio = audio[0] if audio.shape[0] < audio.shape[1] else audio[:, 0]
-            
-            # Flatten to mono if needed (we'll handle stereo in mixing)
-            if audio.ndim == 2:
-                audio = audio.mean(axis=1 if audio.shape[1] <= 2 else 0)
+            # Call ACE-Step pipeline
+            with self._decoded_audio() as decoded, torch.inference_mode():
+                audio = self.pipeline(  # type: ignore
+                    prompt=prompt,
+                    lyrics=lyrics if lyrics else "",
+                    audio_duration=duration,
+                    infer_step=self.num_inference_steps,
+                    guidance_scale=self.guidance_scale * temperature,
+                    manual_seeds=",".join(map(str, seeds)),  # set_seeds only parses str seeds
+                    batch_size=num_clips,
+                    scheduler_type="FLOW",  # ACE-Step's scheduler type
+                    cfg_type="TRIANGULAR"   # CFG type for ACE-Step
+                )
+            
+            # The pipeline returns file paths; take the waveforms captured by
+            # the save_wav_file wrapper instead (decoded at its own rate)
+            if decoded:
+                outputs = decoded
+            elif num_clips == 1:
+                outputs = [(audio, self.sample_rate)]
+            else:
+                outputs = [(clip, self.sample_rate) for clip in audio]
             
-            logger.info(f"Generated audio shape: {audio.shape}, duration: {len(audio)/self.sample_rate:.2f}s")
+            clips = [self._to_mono_clip(clip, source_rate) for clip, source_rate in outputs]
+            for clip, seed in zip(clips, seeds):
+                logger.info("Generated {:.2f}s of audio with ACE-Step (seed {})", len(clip) / self.sample_rate, seed)
             
-            return audio
+            return clips
             
         except Exception as e:
             logger.error(f"Error in ACE-Step generation: {e}")
@@ -326,7 +717,70 @@ class MusicGenerator:
             # Fallback to silence if generation fails
             logger.warning("Falling back to silence generation")
             duration_samples = int(self.clip_duration * self.sample_rate)
-            return np.zeros(duration_samples, dtype=np.float32)
+            # One array per clip, since callers may process clips in place
+            # (np.zeros is backed by lazily zeroed pages, so this is cheap)
+            return [np.zeros(duration_samples, dtype=np.float32) for _ in range(num_clips)]
+    
+    def _to_mono_clip(self, audio: Any, source_rate: int) -> np.ndarray:
+        """
+        Convert one pipeline output to a mono float32 clip
+        
+        Args:
+            audio: Waveform as a tensor or array, mono or stereo in either layout
+            source_rate: Sample rate of audio
+            
+        Returns:
+            Mono float32 audio at the generator's sample rate
+        """
+        # ACE-Step hands save_wav_file host float32 tensors (latents2audio
+        # calls .cpu().float()), so a tensor is downmixed and resampled in
+        # torch, then viewed as NumPy
+        if isinstance(audio, torch.Tensor):
+            if audio.ndim == 2:
+                audio = audio.mean(dim=0 if audio.shape[0] < audio.shape[1] else 1)
+            audio = audio.float()
+            if source_rate != self.sample_rate:
+                from torchaudio.functional import resample
+                audio = resample(audio, source_rate, self.sample_rate)
+            audio = audio.contiguous().cpu().numpy()
+        
+        # Downmix to mono float32 (we'll handle stereo in mixing); the
+        # shorter axis is channels for both (channels, samples) and
+        # (samples, channels) layouts
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 2:
+            audio = audio.mean(axis=0 if audio.shape[0] < audio.shape[1] else 1, dtype=np.float32)
+        return audio
+    
+    def _warmup(self, steps: int = 2):
+        """
+        Run a throwaway generation to compile kernels and autotune cuDNN
+        
+        Uses the real clip duration but a single clip, a one-word prompt and
+        empty lyrics. That covers cuDNN autotuning and the text encoder
+        (compiled with a dynamic token length), but the statically compiled
+        transformer and decoder will still recompile the first time a new
+        prompt/lyric length or batch size comes in.
+        
+        Args:
+            steps: Number of denoising steps for the warm-up run
+        """
+        try:
+            with tempfile.TemporaryDirectory() as save_path, self._decoded_audio(), torch.inference_mode():
+                self.pipeline(  # type: ignore
+                    prompt="warmup",
+                    lyrics="",
+                    audio_duration=self.clip_duration,
+                    infer_step=steps,
+                    guidance_scale=1.0,
+                    manual_seeds="0",
+                    scheduler_type="FLOW",
+                    cfg_type="TRIANGULAR",
+                    save_path=save_path
+                )
+            logger.info("ACE-Step warm-up complete")
+        except Exception as e:
+            logger.warning(f"ACE-Step warm-up failed, first generation will be slower: {e}")
     
     def _generate_conditioning(self, previous_clip: np.ndarray) -> np.ndarray:
         """
@@ -336,13 +790,17 @@ class MusicGenerator:
             previous_clip: Previous audio clip
             
         Returns:
-            Conditioning signal
+            Conditioning signal (a read-only view into previous_clip)
         """
         # TODO: Implement MusicControlNet conditioning
         
         # Extract lead-out section (last 2 seconds) from previous clip
         lead_out_samples = int(2 * self.sample_rate)
+        
+        # The slice is a view, so nothing is copied; callers that need to
+        # modify it should take np.ascontiguousarray / .copy() themselves
         lead_out = previous_clip[-lead_out_samples:]
+        lead_out.flags.writeable = False
         
         # Placeholder: return lead-out as conditioning
         return lead_out
@@ -355,23 +813,28 @@ class MusicGenerator:
             clip: Raw generated clip
             
         Returns:
-            Structured clip
+            Structured clip: clip itself at the right length, a view of it
+            when too long, or a new zero-padded array when too short
         """
         # Ensure correct total duration
         expected_samples = int(self.clip_duration * self.sample_rate)
         
-        if len(clip) < expected_samples:
-            # Pad if too short
-            padding = expected_samples - len(clip)
-            clip = np.pad(clip, (0, padding), mode='constant')
-        elif len(clip) > expected_samples:
-            # Truncate if too long
-            clip = clip[:expected_samples]
-        
         # Mark sections (conceptually - actual structuring would be in generation)
         # 2s lead-in, 28s main, 2s lead-out
         
-        return clip
+        if len(clip) == expected_samples:
+            return clip
+        
+        if len(clip) > expected_samples:
+            # Truncate if too long (a view, no copy)
+            return clip[:expected_samples]
+        
+        # Pad if too short; only the tail is zero-filled. A fresh buffer
+        # is needed since callers keep every clip of the song
+        padded = np.empty(expected_samples, dtype=clip.dtype)
+        padded[:len(clip)] = clip
+        padded[len(clip):] = 0
+        return padded
     
     def _apply_lora(self, lora_path: str):
         """
@@ -394,14 +857,28 @@ class MusicGenerator:
         except Exception as e:
             logger.error(f"Error applying LoRA: {e}")
     
-    def unload_models(self):
-        """Unload models to free memory"""
+    def unload_models(self, release_to_os: bool = False):
+        """
+        Unload models to free memory
+        
+        The pipeline is also dropped from the shared cache; other generators
+        that already hold it keep it alive until they unload too.
+        
+        Args:
+            release_to_os: Return cached CUDA blocks to the driver with
+                empty_cache (synchronizes the device). Leave False when
+                another model is loaded next so the allocator reuses them
+        """
         try:
             if self.pipeline is not None:
+                for key in [k for k, p in _ACE_PIPELINE_CACHE.items() if p is self.pipeline]:
+                    del _ACE_PIPELINE_CACHE[key]
+                
                 del self.pipeline
                 self.pipeline = None
+                self._lora_path = None
                 
-                if torch.cuda.is_available():
+                if release_to_os and cuda_available():
                     torch.cuda.empty_cache()
                 
                 logger.info("Models unloaded successfully")
@@ -99,30 +99,32 @@ class LEMMInterface:
             progress(0, desc="Analyzing prompt...")
             analysis = self.prompt_analyzer.analyze(prompt)
             
-            # Generate clips
+            # Generate clips, one batched pipeline call at a time so progress
+            # moves with every batch
             clips = []
-            for i in range(num_clips):
-                progress((i + 1) / (num_clips + 2), desc=f"Generating clip {i+1}/{num_clips}...")
-                
-                clip = self.music_generator.generate_clip(
+            batch_size = max(1, self.music_generator.max_batch_clips)
+            for start in range(0, num_clips, batch_size):
+                count = min(batch_size, num_clips - start)
+                progress(
+                    (start + 1) / (num_clips + 2),
+                    desc=f"Generating clips {start + 1}-{start + count} of {num_clips}..."
+                )
+                clips.extend(self.music_generator.generate_clips(
                     prompt=prompt,
                     lyrics=lyrics,
-                    clip_index=i,
+                    num_clips=count,
                     analysis=analysis,
-                    previous_clip=clips[-1] if clips else None,
                     use_lora=use_lora,
                     lora_path=lora_path,
                     temperature=temperature
-                )
-                clips.append(clip)
+                ))
             
             progress((num_clips + 1) / (num_clips + 2), desc="Processing and mixing...")
             
-            # Process each clip (stem separation + enhancement)
-            processed_clips = []
-            for i, clip in enumerate(clips):
-                processed = self.audio_processor.process_clip(clip, has_vocals=bool(lyrics))
-                processed_clips.append(processed)
+            # Process all clips (batched stem separation + enhancement)
+            processed_clips = self.audio_processor.process_clips(
+                clips, has_vocals=[bool(lyrics)] * len(clips)
+            )
             
             progress((num_clips + 1.5) / (num_clips + 2), desc="Chaining clips...")
             
@@ -2,10 +2,20 @@
 Configuration loader for LEMM
 """
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import pickle
 import yaml
 from loguru import logger
 
+# Prefer the libyaml-backed C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader  # type: ignore
+
+# Suffix of the parsed-config cache written next to the YAML file
+CACHE_SUFFIX = ".cache.pkl"
+
 
 def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
     """
@@ -24,8 +34,17 @@ def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
         return get_default_config()
     
     try:
+        mtime = config_file.stat().st_mtime_ns
+        cache_file = config_file.with_name(config_file.name + CACHE_SUFFIX)
+        
+        config = _read_cached_config(cache_file, mtime)
+        if config is not None:
+            logger.info(f"Configuration loaded from {config_path} (cached)")
+            return config
+        
         with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=SafeLoader)
+        _write_cached_config(cache_file, mtime, config)
         logger.info(f"Configuration loaded from {config_path}")
         return config
     except Exception as e:
@@ -33,6 +52,46 @@ def load_config(config_path: str = "config/config.yaml") -> Dict[str, Any]:
         return get_default_config()
 
 
+def _read_cached_config(cache_file: Path, mtime: int) -> Optional[Dict[str, Any]]:
+    """
+    Read a previously parsed configuration if it matches the YAML mtime
+    
+    Args:
+        cache_file: Path to the pickle cache
+        mtime: Modification time (ns) of the YAML file
+        
+    Returns:
+        Cached configuration dictionary, or None if missing/stale
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_mtime, config = pickle.load(f)
+        if cached_mtime == mtime:
+            return config
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable config cache {cache_file}: {e}")
+    return None
+
+
+def _write_cached_config(cache_file: Path, mtime: int, config: Dict[str, Any]):
+    """
+    Store the parsed configuration next to the YAML file
+    
+    Args:
+        cache_file: Path to the pickle cache
+        mtime: Modification time (ns) of the YAML file
+        config: Parsed configuration dictionary
+    """
+    try:
+        with open(cache_file, 'wb') as f:
+            pickle.dump((mtime, config), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        # Read-only deployments simply skip the cache
+        logger.debug(f"Could not write config cache {cache_file}: {e}")
+
+
 def get_default_config() -> Dict[str, Any]:
     """
     Get default configuration
@@ -53,13 +112,23 @@ def get_default_config() -> Dict[str, Any]:
             "lead_in_duration": 2,
             "lead_out_duration": 2,
             "main_duration": 28,
-            "crossfade_duration": 2
+            "crossfade_duration": 2,
+            "skip_separation_when_no_vocals": True,
+            "mixer_backend": "numpy",
+            "mixer_device": "cuda",
+            "mixer_cuda_graphs": True,
+            "enhance_workers": None,
+            "gpu_enhancement": False
         },
         "models": {
             "ace_step": {
                 "path": "models/ace_step",
                 "device": "cuda",
-                "dtype": "float16"
+                "dtype": "float16",
+                "torch_compile": False,
+                "quantize_int8": False,
+                "warmup": True,
+                "max_batch_clips": 4
             },
             "song_composer": {
                 "path": "models/song_composer",
@@ -71,7 +140,14 @@ def get_default_config() -> Dict[str, Any]:
             },
             "demucs": {
                 "model": "htdemucs",
-                "device": "cuda"
+                "device": "cuda",
+                "segment_batch": 4,
+                "compile": False,
+                "autocast_dtype": "off",
+                "pipeline_clips": 2,
+                "eager_load": False,
+                "onnx_path": None,
+                "int8": False
             },
             "so_vits_svc": {
                 "path": "models/so_vits_svc",
@@ -0,0 +1,37 @@
+"""
+Lazy, cached GPU detection for LEMM
+"""
+from functools import lru_cache
+from loguru import logger
+
+
+@lru_cache(maxsize=None)
+def cuda_available() -> bool:
+    """
+    Check for CUDA once and cache the result
+    
+    torch is imported on first call so that app startup does not pay for
+    the import or the driver probe.
+    
+    Returns:
+        True if a CUDA device is usable
+    """
+    import torch
+    return torch.cuda.is_available()
+
+
+@lru_cache(maxsize=None)
+def get_device(preferred: str = "cuda") -> str:
+    """
+    Resolve the configured device, falling back to CPU without CUDA
+    
+    Args:
+        preferred: Device requested in the configuration
+        
+    Returns:
+        Device string to use for inference
+    """
+    if preferred.startswith("cuda") and not cuda_available():
+        logger.warning(f"CUDA not available, using CPU instead of {preferred}")
+        return "cpu"
+    return preferred
@@ -0,0 +1,34 @@
+"""
+Optional Numba JIT for numeric helper loops
+"""
+from typing import Any, Callable, Optional
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+
+def maybe_njit(func: Optional[Callable] = None, **options: Any) -> Any:
+    """
+    JIT-compile a function with Numba when it is installed
+    
+    Usable as ``@maybe_njit`` or ``@maybe_njit(parallel=True)``. Compiles
+    with ``njit(cache=True, fastmath=True, **options)``; without Numba the
+    function is returned unchanged and runs as plain Python.
+    
+    Args:
+        func: Function to compile
+        **options: Extra njit options
+        
+    Returns:
+        Compiled function, or a decorator when called with options only
+    """
+    def decorate(f: Callable) -> Callable:
+        if not NUMBA_AVAILABLE:
+            return f
+        return njit(**{"cache": True, "fastmath": True, **options})(f)
+    
+    return decorate(func) if func is not None else decorate